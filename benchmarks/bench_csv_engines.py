@@ -0,0 +1,115 @@
+"""CSV engine benchmark for data.Loader.
+
+Writes synthetic LabsCorePopulatedTable files and loads each one with every
+Loader engine in a fresh interpreter, reporting rows/sec and peak RSS.
+
+Usage:
+    python benchmarks/bench_csv_engines.py [--rows 1000000 10000000 50000000]
+        [--engines c pyarrow] [--tmpdir DIR]
+"""
+import argparse as _argparse
+import json as _json
+import os as _os
+import subprocess as _subprocess
+import sys as _sys
+import tempfile as _tempfile
+
+import numpy as _np
+import pandas as _pd
+
+_ROOT_PATH = _os.path.dirname(_os.path.dirname(_os.path.realpath(__file__)))
+_LAB_NAMES = [
+    ('CBC: WHITE BLOOD CELL COUNT', 'k/cumm'),
+    ('CBC: HEMOGLOBIN', 'gm/dl'),
+    ('METABOLIC: GLUCOSE', 'mg/dL'),
+    ('METABOLIC: SODIUM', 'mmol/L'),
+    ('URINALYSIS: PH', 'no unit'),
+]
+# Peak RSS is read from VmHWM, which starts afresh at exec, as ru_maxrss of a
+# child carries over the peak of the parent that generated the data
+_SNIPPET = '''
+import json, sys, time
+from emr_analysis import data
+start = time.perf_counter()
+dfs = data.Loader(engine=sys.argv[2])('text', sys.argv[1])
+elapsed = time.perf_counter() - start
+with open('/proc/self/status') as status:
+    peak_kb = next(int(line.split()[1]) for line in status
+                   if line.startswith('VmHWM:'))
+print(json.dumps({
+    'rows': len(dfs['labs']),
+    'seconds': elapsed,
+    'peak_rss_mb': peak_kb / 1024,
+}))
+'''
+
+
+def write_labs_file(path: str, n_rows: int, chunk_rows: int = 1000000):
+    """Writes a synthetic tab-delimited labs file with a UTF-8 BOM.
+
+    Args:
+        path (str):
+            Path of the file to write.
+        n_rows (int):
+            Number of data rows.
+        chunk_rows (int, optional):
+            Number of rows generated at a time. Defaults to 1000000.
+    """
+    rng = _np.random.default_rng(0)
+    patient_ids = _np.array([f'{i:08X}-0000-4000-AAAA-{i:012X}' for i in range(100000)])
+    names = _np.array([name for name, _ in _LAB_NAMES])
+    units = _np.array([unit for _, unit in _LAB_NAMES])
+    with open(path, mode='w', encoding='utf-8-sig', newline='') as file_pointer:
+        for start in range(0, n_rows, chunk_rows):
+            size = min(chunk_rows, n_rows - start)
+            lab = rng.integers(0, len(_LAB_NAMES), size)
+            dates = (_np.datetime64('1990-01-01T00:00:00.000')
+                     + rng.integers(0, 10 ** 12, size).astype('timedelta64[ms]'))
+            _pd.DataFrame({
+                'PatientID': patient_ids[rng.integers(0, len(patient_ids), size)],
+                'AdmissionID': rng.integers(1, 10, size),
+                'LabName': names[lab],
+                'LabValue': rng.uniform(0, 200, size).round(1),
+                'LabUnits': units[lab],
+                'LabDateTime': _pd.Series(dates).dt.strftime('%Y-%m-%d %H:%M:%S.%f').str[:-3],
+            }).to_csv(file_pointer, sep='\t', index=False, header=start == 0)
+
+
+def run(rows: list, engines: list, tmpdir: str) -> None:
+    """Runs the benchmark and prints one line per file size and engine.
+
+    Args:
+        rows (list):
+            Numbers of rows of the synthetic labs files.
+        engines (list):
+            Loader engines to compare.
+        tmpdir (str):
+            Directory for the synthetic files.
+    """
+    print(f'{"rows":>12} {"engine":>8} {"seconds":>9} {"rows/sec":>12} {"peak RSS MB":>12}')
+    for n_rows in rows:
+        path = _os.path.join(tmpdir, f'LabsCorePopulatedTable-{n_rows}.txt')
+        if not _os.path.isfile(path):
+            write_labs_file(path, n_rows)
+        for engine in engines:
+            output = _subprocess.run(
+                [_sys.executable, '-c', _SNIPPET, path, engine],
+                cwd=_ROOT_PATH, capture_output=True, text=True, check=True)
+            result = _json.loads(output.stdout.strip().splitlines()[-1])
+            print(f'{result["rows"]:>12} {engine:>8} {result["seconds"]:>9.2f} '
+                  f'{result["rows"] / result["seconds"]:>12.0f} '
+                  f'{result["peak_rss_mb"]:>12.0f}')
+
+
+if __name__ == '__main__':
+    parser = _argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, nargs='+',
+                        default=[1000000, 10000000, 50000000])
+    parser.add_argument('--engines', nargs='+', default=['c', 'pyarrow'])
+    parser.add_argument('--tmpdir', default=None)
+    args = parser.parse_args()
+    if args.tmpdir is None:
+        with _tempfile.TemporaryDirectory() as tmpdir:
+            run(args.rows, args.engines, tmpdir)
+    else:
+        run(args.rows, args.engines, args.tmpdir)
@@ -0,0 +1,62 @@
+"""Import-time benchmark for the emr_analysis package.
+
+Imports 'emr_analysis.data' in fresh interpreters and fails if the best
+time exceeds the budget, or if any heavy optional dependency is imported.
+
+Usage:
+    python benchmarks/bench_import.py [--budget SECONDS] [--repeat N]
+"""
+import argparse as _argparse
+import json as _json
+import os as _os
+import subprocess as _subprocess
+import sys as _sys
+
+_ROOT_PATH = _os.path.dirname(_os.path.dirname(_os.path.realpath(__file__)))
+_HEAVY_MODULES = ['tkinter', 'magic', 'dash', 'plotly', 'matplotlib']
+_SNIPPET = '''
+import json, sys, time
+start = time.perf_counter()
+import emr_analysis.data
+elapsed = time.perf_counter() - start
+print(json.dumps({
+    'seconds': elapsed,
+    'heavy': [m for m in %r if m in sys.modules],
+}))
+''' % (_HEAVY_MODULES,)
+
+
+def run(budget: float = 1.5, repeat: int = 5) -> int:
+    """Runs the benchmark and reports the results.
+
+    Args:
+        budget (float, optional):
+            Maximum allowed import time in seconds. Defaults to 1.5.
+        repeat (int, optional):
+            Number of fresh interpreters to time. Defaults to 5.
+
+    Returns:
+        int:
+            Process exit code, 0 if within budget and 1 otherwise.
+    """
+    results = []
+    for _ in range(repeat):
+        output = _subprocess.run(
+            [_sys.executable, '-c', _SNIPPET],
+            cwd=_ROOT_PATH, capture_output=True, text=True, check=True)
+        results.append(_json.loads(output.stdout.strip().splitlines()[-1]))
+    best = min(result['seconds'] for result in results)
+    heavy = sorted({m for result in results for m in result['heavy']})
+    print(f'import emr_analysis.data: best {best:.3f}s '
+          f'of {repeat} runs (budget {budget:.3f}s)')
+    if heavy:
+        print(f'heavy modules imported: {", ".join(heavy)}')
+    return int(best > budget or bool(heavy))
+
+
+if __name__ == '__main__':
+    parser = _argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--budget', type=float, default=1.5)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+    _sys.exit(run(args.budget, args.repeat))
@@ -0,0 +1,148 @@
+"""Lab figure benchmark for plot.IndSummary.
+
+Plots the labs of one synthetic long-stay patient, at full resolution with
+the default render mode and with WebGL traces downsampled to a point budget,
+reporting the points drawn, the figure JSON payload size and the time to
+build and serialise the figures.
+
+Usage:
+    python benchmarks/bench_lab_figures.py [--admissions 5] [--days 120]
+        [--per-day 24] [--max-points 500 2000] [--repeat 3]
+"""
+import argparse as _argparse
+import os as _os
+import sys as _sys
+import time as _time
+
+import numpy as _np
+import pandas as _pd
+
+_ROOT_PATH = _os.path.dirname(_os.path.dirname(_os.path.realpath(__file__)))
+_sys.path.insert(0, _ROOT_PATH)
+
+from emr_analysis import plot as _plot  # noqa: E402
+
+_LAB_NAMES = [
+    ('CBC: WHITE BLOOD CELL COUNT', 'k/cumm'),
+    ('CBC: RED BLOOD CELL COUNT', 'm/cumm'),
+    ('CBC: HEMOGLOBIN', 'gm/dl'),
+    ('CBC: PLATELET COUNT', 'k/cumm'),
+    ('METABOLIC: GLUCOSE', 'mg/dL'),
+    ('METABOLIC: SODIUM', 'mmol/L'),
+    ('METABOLIC: POTASSIUM', 'mmol/L'),
+    ('METABOLIC: CREATININE', 'mg/dL'),
+    ('URINALYSIS: PH', 'no unit'),
+    ('URINALYSIS: SPECIFIC GRAVITY', 'no unit'),
+]
+
+
+def make_lab_frame(admissions: int, days: int, per_day: int) -> _pd.DataFrame:
+    """Makes the labs of one patient, as prepared by IndSummary._lab_frame().
+
+    Args:
+        admissions (int):
+            Number of admissions.
+        days (int):
+            Length of each admission in days.
+        per_day (int):
+            Measurements of each lab per day.
+
+    Returns:
+        pandas.DataFrame
+    """
+    rng = _np.random.default_rng(0)
+    n_points = days * per_day
+    frames = []
+    start = _pd.Timestamp('2000-01-01')
+    for admission in range(1, admissions + 1):
+        for name, unit in _LAB_NAMES:
+            times = start + _pd.to_timedelta(
+                _np.sort(rng.uniform(0, days, n_points)), unit='D')
+            frames.append(_pd.DataFrame({
+                'PatientID': 'BENCH',
+                'AdmissionID': admission,
+                'LabName': name,
+                'LabValue': (100 + rng.normal(0, 5, n_points).cumsum()).round(1),
+                'LabUnits': unit,
+                'LabDateTime': times.normalize(),
+            }))
+        start += _pd.Timedelta(days=days + 30)
+    lab_info = _pd.concat(frames, ignore_index=True).sort_values(
+        ['LabDateTime'], kind='mergesort')
+    lab_info['LabName'] = lab_info['LabName'].astype('category')
+    lab_info['LabUnits'] = lab_info['LabUnits'].astype('category')
+    lab_info['StartDate'] = lab_info.groupby(
+        ['AdmissionID', 'LabName'], observed=True)['LabDateTime'].transform('min')
+    lab_info['DayInHospital'] = (lab_info['LabDateTime'] - lab_info['StartDate']).dt.days
+    return lab_info
+
+
+def measure(lab_info: _pd.DataFrame, max_points: int, render_mode: str,
+            repeat: int) -> dict:
+    """Builds and serialises the figures, keeping the best time.
+
+    Args:
+        lab_info (pandas.DataFrame):
+            The patient's labs.
+        max_points (int):
+            Point budget of each series, None for all.
+        render_mode (str):
+            Render mode of the figures.
+        repeat (int):
+            Number of runs.
+
+    Returns:
+        dict:
+            Points drawn, payload bytes and best build and serialise times.
+    """
+    best = {'build': float('inf'), 'json': float('inf')}
+    for _ in range(repeat):
+        start = _time.perf_counter()
+        figs = _plot._lab_figures(lab_info, max_points, render_mode)
+        built = _time.perf_counter()
+        payload = [fig.to_json() for fig in figs.values() if fig is not None]
+        done = _time.perf_counter()
+        best['build'] = min(best['build'], built - start)
+        best['json'] = min(best['json'], done - built)
+    best['points'] = sum(len(trace.x) for fig in figs.values() if fig is not None
+                         for trace in fig.data)
+    best['bytes'] = sum(len(json_text) for json_text in payload)
+    return best
+
+
+def run(admissions: int, days: int, per_day: int, max_points: list,
+        repeat: int) -> None:
+    """Runs the benchmark and prints one line per configuration.
+
+    Args:
+        admissions (int):
+            Number of admissions.
+        days (int):
+            Length of each admission in days.
+        per_day (int):
+            Measurements of each lab per day.
+        max_points (list):
+            Point budgets to compare against full resolution.
+        repeat (int):
+            Number of runs of each configuration.
+    """
+    lab_info = make_lab_frame(admissions, days, per_day)
+    print(f'{len(lab_info)} lab rows, {admissions * len(_LAB_NAMES)} series')
+    print(f'{"max points":>10} {"render":>7} {"points":>9} {"payload MB":>11} '
+          f'{"build s":>8} {"json s":>7}')
+    for budget, render_mode in [(None, 'auto')] + [(n, 'webgl') for n in max_points]:
+        result = measure(lab_info, budget, render_mode, repeat)
+        print(f'{str(budget):>10} {render_mode:>7} {result["points"]:>9} '
+              f'{result["bytes"] / 1024 ** 2:>11.2f} {result["build"]:>8.2f} '
+              f'{result["json"]:>7.2f}')
+
+
+if __name__ == '__main__':
+    parser = _argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--admissions', type=int, default=5)
+    parser.add_argument('--days', type=int, default=120)
+    parser.add_argument('--per-day', type=int, default=24)
+    parser.add_argument('--max-points', type=int, nargs='+', default=[500, 2000])
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+    run(args.admissions, args.days, args.per_day, args.max_points, args.repeat)
@@ -1,6 +1,13 @@
 __author__ = 'Ankit Arni, Brandon Lim, Luke Davies'
 __author_email__ = 'aa1183@exeter.ac.uk, beml201@exeter.ac.uk, led216@exeter.ac.uk'
 __version__ = '0.1.2'
-__all__ = ['data', 'plot', 'summary']
+__all__ = ['comorbidity', 'data', 'plot', 'summary']
 
-from . import *
+
+def __getattr__(name):
+    # Submodules are imported on first access, so that 'import emr_analysis'
+    # does not pull in pandas, matplotlib, dash or plotly up front
+    if name in __all__:
+        import importlib
+        return importlib.import_module(f'.{name}', __name__)
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
@@ -0,0 +1,172 @@
+import numpy as _np
+import pandas as _pd
+import scipy.sparse as _sparse
+
+
+class Comorbidity():
+    """Diagnosis co-occurrence analysis over a sparse patient x diagnosis matrix.
+
+    Patients and PrimaryDiagnosisCodes are integer coded, and the incidence
+    matrix has a 1 where a patient has had a diagnosis in any admission. The
+    co-occurrence matrix (patients having both codes) is its sparse product
+    with itself, built on first use. No dense matrix of all codes is built.
+
+    Support is the fraction of patients with a code (or pair of codes),
+    confidence of B given A is the fraction of patients with A who also have
+    B, and lift is the support of the pair over the product of the supports.
+    """
+
+    def __init__(self, dfs):
+        """Builds the incidence matrix.
+
+        Args:
+            dfs (dict):
+                Dictionary of dataframes with a 'diagnosis' table, and
+                optionally a 'patients' table so that patients without any
+                diagnosis count towards the supports.
+        """
+        diagnosis = dfs['diagnosis']
+
+        patient_ids = _pd.Index(diagnosis['PatientID'])
+        if 'patients' in dfs:
+            patient_ids = _pd.Index(dfs['patients']['PatientID']).append(
+                patient_ids)
+        self.patient_ids = patient_ids.unique()
+        rows = self.patient_ids.get_indexer(diagnosis['PatientID'])
+
+        columns, codes = _pd.factorize(diagnosis['PrimaryDiagnosisCode'],
+                                       sort=True)
+        self.codes = _pd.Index(_np.asarray(codes), name='PrimaryDiagnosisCode')
+
+        known = (rows >= 0) & (columns >= 0)
+        incidence = _sparse.csr_matrix(
+            (_np.ones(known.sum(), dtype=_np.int32),
+             (rows[known], columns[known])),
+            shape=(len(self.patient_ids), len(self.codes)))
+        incidence.sum_duplicates()
+        incidence.data[:] = 1
+        self.incidence = incidence
+
+        self.prevalence = _np.asarray(incidence.sum(axis=0)).ravel()
+        self._cooccurrence = None
+
+    @property
+    def cooccurrence(self):
+        """scipy.sparse.csr_matrix: Number of patients having both codes."""
+        if self._cooccurrence is None:
+            incidence = self.incidence.tocsc()
+            self._cooccurrence = (incidence.T @ incidence).tocsr()
+        return self._cooccurrence
+
+    def support(self, code_a, code_b=None):
+        """Calculates the fraction of patients with a code, or both of two.
+
+        Args:
+            code_a (str):
+                A PrimaryDiagnosisCode.
+            code_b (str, optional):
+                A second PrimaryDiagnosisCode. Defaults to None.
+
+        Returns:
+            float
+        """
+        a = self.codes.get_loc(code_a)
+        b = a if code_b is None else self.codes.get_loc(code_b)
+        return self.cooccurrence[a, b] / len(self.patient_ids)
+
+    def lift(self, code_a, code_b):
+        """Calculates how much more often two codes occur together than if
+        they were independent.
+
+        Args:
+            code_a (str):
+                A PrimaryDiagnosisCode.
+            code_b (str):
+                A second PrimaryDiagnosisCode.
+
+        Returns:
+            float
+        """
+        a, b = self.codes.get_loc(code_a), self.codes.get_loc(code_b)
+        return (self.cooccurrence[a, b] * len(self.patient_ids)
+                / (self.prevalence[a] * self.prevalence[b]))
+
+    def top_k(self, code, k=10, by='Patients', min_patients=1):
+        """Finds the codes that occur most with a code.
+
+        Only the codes co-occurring with 'code', the non-zeros of its row of
+        the co-occurrence matrix, are looked at.
+
+        Args:
+            code (str):
+                The PrimaryDiagnosisCode to find neighbours of.
+            k (int, optional):
+                Number of codes to return. Defaults to 10.
+            by (str, optional):
+                Column to rank by, one of 'Patients', 'Support', 'Confidence'
+                or 'Lift'. Defaults to 'Patients'.
+            min_patients (int, optional):
+                Minimum number of patients having both codes, to keep rare
+                codes from topping the lift. Defaults to 1.
+
+        Returns:
+            pandas.DataFrame:
+                Indexed by PrimaryDiagnosisCode, with the number of
+                'Patients' having both codes, 'Support', 'Confidence' (of the
+                code given 'code') and 'Lift', best first.
+        """
+        a = self.codes.get_loc(code)
+        row = self.cooccurrence.getrow(a)
+        keep = (row.indices != a) & (row.data >= min_patients)
+        others, both = row.indices[keep], row.data[keep]
+
+        n_patients = len(self.patient_ids)
+        neighbours = _pd.DataFrame({
+            'Patients': both,
+            'Support': both / n_patients,
+            'Confidence': both / self.prevalence[a],
+            'Lift': both * n_patients
+            / (self.prevalence[a] * self.prevalence[others]),
+        }, index=self.codes[others])
+
+        if len(neighbours) > k:
+            best = _np.argpartition(-neighbours[by].to_numpy(), k - 1)[:k]
+            neighbours = neighbours.iloc[best]
+        return neighbours.sort_values(by, ascending=False, kind='mergesort')
+
+    def heatmap(self, k=20, measure='Patients'):
+        """Creates a heatmap of co-occurrence between the most common codes.
+
+        Args:
+            k (int, optional):
+                Number of most common codes to include. Defaults to 20.
+            measure (str, optional):
+                'Patients' for co-occurrence counts or 'Lift'.
+                Defaults to 'Patients'.
+
+        Returns:
+            fig : matplotlib.figure.Figure
+            ax : matplotlib.axes.Axes
+        """
+        import matplotlib.pyplot as _plt
+
+        k = min(k, len(self.codes))
+        top = _np.sort(_np.argpartition(-self.prevalence, k - 1)[:k]) \
+            if k else _np.array([], dtype=int)
+        values = self.cooccurrence[top][:, top].toarray().astype(float)
+        if measure == 'Lift':
+            values = values * len(self.patient_ids) / _np.outer(
+                self.prevalence[top], self.prevalence[top])
+
+        fig = _plt.figure(figsize=(10, 8))
+        ax = fig.add_subplot()
+        image = ax.imshow(values, cmap='viridis')
+        fig.colorbar(image, ax=ax, label=measure)
+
+        ax.set_xticks(range(k))
+        ax.set_xticklabels(self.codes[top], rotation=90)
+        ax.set_yticks(range(k))
+        ax.set_yticklabels(self.codes[top])
+        ax.set_title(f"Diagnosis co-occurrence ({measure})")
+
+        return fig, ax
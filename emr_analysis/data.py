@@ -1,18 +1,74 @@
 import os as _os
 import re as _re
+import glob as _glob
+import json as _json
+import shutil as _shutil
+import hashlib as _hashlib
+import importlib.util as _importlib_util
+import numpy as _np
 import pandas as _pd
 import typing as _ty
 import logging as _lg
-import tkinter as _tk
+from io import BytesIO as _BytesIO
 from sys import stdout as _stdout
 from zipfile import ZipFile as _zf
-from magic import from_file as _magic_from_file
-from tkinter.filedialog import askopenfilename as _tk_filedialog
+from concurrent.futures import ProcessPoolExecutor as _ProcessPool
+from pandas.api.types import union_categoricals as _union_categoricals
 
 _BASE_PATH = _os.path.realpath(__file__)
 _lg.basicConfig(stream = _stdout, level = _lg.INFO)
 _LOGGER = _lg.Logger(name = __file__)
 
+
+_PYARROW_AVAILABLE = None
+
+
+def _has_pyarrow() -> bool:
+    """Check, once per process, whether the optional pyarrow dependency is installed.
+
+    Warns the first time it is found missing. pyarrow itself is not imported.
+
+    Returns:
+        bool:
+            True if pyarrow is available.
+    """
+    global _PYARROW_AVAILABLE
+    if _PYARROW_AVAILABLE is None:
+        _PYARROW_AVAILABLE = _importlib_util.find_spec('pyarrow') is not None
+        if not _PYARROW_AVAILABLE:
+            _LOGGER.warning('pyarrow is not installed, using the "c" CSV engine')
+    return _PYARROW_AVAILABLE
+
+
+def _concat_emr_frames(frames: _ty.List[_pd.DataFrame]) -> _pd.DataFrame:
+    """Concatenates DataFrames of the same content type.
+
+    Categorical columns are combined with a union of their categories
+    instead of falling back to object dtype.
+
+    Args:
+        frames (_ty.List[_pd.DataFrame]):
+            DataFrames with the same columns, in row order.
+
+    Returns:
+        data (_pd.DataFrame):
+            A single DataFrame with a fresh RangeIndex.
+    """
+    if len(frames) == 0:
+        return _pd.DataFrame()
+    if len(frames) == 1:
+        return frames[0]
+    columns = {}
+    for column in frames[0].columns:
+        parts = [frame[column] for frame in frames]
+        if all(isinstance(part.dtype, _pd.CategoricalDtype) for part in parts):
+            columns[column] = _pd.Series(
+                _union_categoricals(parts, sort_categories = True), name = column)
+        else:
+            columns[column] = _pd.concat(parts, ignore_index = True)
+    data = _pd.DataFrame(columns)
+    return data
+
 class Loader:
     """Loads data from a text or zip file.
     Input files must match the supported EMR content type patterns, for both filename & data header.
@@ -24,30 +80,124 @@ class Loader:
     EMR_FILE_ENC = 'utf-8-sig'
     LOAD_TYPES = {'example', 'zip', 'text'}
     EMR_FILE_TYPES = {'text/plain', 'application/zip'}
+    EMR_DATE_FORMAT = '%Y-%m-%d %H:%M:%S.%f'
     EMR_PATTERNS = {
         'admissions': {
             'FILENAME': _re.compile(r"^[Aa]dmissions[Cc]ore.+\.[Tt][Xx][Tt]"),
             'HEADER': _re.compile(r"^[Pp]atient[Ii][Dd].+[Aa]dmission[Ss]tart[Dd]ate.*"),
+            'SCHEMA': {
+                'DTYPES': {'AdmissionID': 'int32'},
+                'DATES': ['AdmissionStartDate', 'AdmissionEndDate'],
+                'KEYS': ['PatientID', 'AdmissionID'],
+            },
         },
         'diagnosis': {
             'FILENAME': _re.compile(r"^[Aa]dmissions[Dd]iagnoses[Cc]ore.+\.[Tt][Xx][Tt]"),
             'HEADER': _re.compile(r"^[Pp]atient[Ii][Dd].+[Dd]iagnosis[Cc]ode.*"),
+            'SCHEMA': {
+                'DTYPES': {
+                    'AdmissionID': 'int32',
+                    'PrimaryDiagnosisCode': 'category',
+                    'PrimaryDiagnosisDescription': 'category',
+                },
+                'DATES': [],
+                'KEYS': ['PatientID', 'AdmissionID'],
+            },
         },
         'labs': {
             'FILENAME': _re.compile(r"^[Ll]abs[Cc]ore.+\.[Tt][Xx][Tt]"),
             'HEADER': _re.compile(r"^[Pp]atient[Ii][Dd].+[Ll]ab[Nn]ame.*"),
+            'SCHEMA': {
+                'DTYPES': {
+                    'AdmissionID': 'int32',
+                    'LabName': 'category',
+                    'LabValue': 'float32',
+                    'LabUnits': 'category',
+                },
+                'DATES': ['LabDateTime'],
+                'KEYS': None,
+            },
         },
         'patients': {
             'FILENAME': _re.compile(r"^[Pp]atient[Cc]ore.+\.[Tt][Xx][Tt]"),
-            'HEADER': _re.compile(r"^[Pp]atient[Ii][Dd].+[Pp]atient(?:[Dd]ate[Oo]f[Bb]irth|[Dd][Oo][Bb]).*")
+            'HEADER': _re.compile(r"^[Pp]atient[Ii][Dd].+[Pp]atient(?:[Dd]ate[Oo]f[Bb]irth|[Dd][Oo][Bb]).*"),
+            'SCHEMA': {
+                'DTYPES': {
+                    'PatientGender': 'category',
+                    'PatientRace': 'category',
+                    'PatientMaritalStatus': 'category',
+                    'PatientLanguage': 'category',
+                },
+                'DATES': ['PatientDateOfBirth'],
+                'KEYS': ['PatientID'],
+            },
         }
     }
 
+    EMR_HEADER_PATTERN = _re.compile('|'.join(
+        f'(?P<{c_type}>{pattern["HEADER"].pattern})'
+        for c_type, pattern in EMR_PATTERNS.items()))
+    EMR_FILENAME_PATTERN = _re.compile('|'.join(
+        f'(?P<{c_type}>{pattern["FILENAME"].pattern})'
+        for c_type, pattern in EMR_PATTERNS.items()))
+    FILE_SIGNATURES = {
+        b'PK\x03\x04': 'application/zip',
+        b'PK\x05\x06': 'application/zip',
+    }
+    TEXT_BOMS = {
+        b'\xef\xbb\xbf': 'utf-8-sig',
+        b'\xff\xfe': 'utf-16-le',
+        b'\xfe\xff': 'utf-16-be',
+    }
+    SNIFF_BYTES = 64 * 1024
+    ENGINES = {'c', 'pyarrow'}
+    CHUNKSIZE = 100000
+    SPLIT_MIN_BYTES = 64 * 1024 * 1024
+
+    def __init__(
+        self, workers: int = 1,
+        cache_dir: _ty.Optional[str] = None,
+        cache_max_bytes: int = 4 * 1024 ** 3,
+        engine: str = 'c'
+    ) -> None:
+        """Initializes the Loader object.
+
+        Args:
+            workers (int, optional):
+                Number of worker processes used to parse zip file members.
+                Members larger than 'SPLIT_MIN_BYTES' are also split into
+                byte ranges at line boundaries and parsed in parallel.
+                Defaults to 1 (serial loading).
+            cache_dir (str, optional):
+                Directory used to cache zip file loads as memory-mappable
+                NumPy column files, keyed by the zip file path, size,
+                modification time and content hash.
+                Defaults to None (no caching).
+            cache_max_bytes (int, optional):
+                Total size of 'cache_dir' above which the least recently used
+                cache entries are evicted. Defaults to 4 GiB.
+            engine (str, optional):
+                CSV parser used for whole-file reads, either 'c' (pandas) or
+                'pyarrow' (multithreaded pyarrow.csv, falling back to 'c' when
+                pyarrow is not installed). Chunked and filtered reads always use 'c'.
+                Defaults to 'c'.
+        """
+        if engine not in __class__.ENGINES:
+            raise ValueError(f'"engine" must be one of {sorted(__class__.ENGINES)}')
+        if engine == 'pyarrow' and not _has_pyarrow():
+            engine = 'c'
+        self.workers = workers
+        self.cache_dir = cache_dir
+        self.cache_max_bytes = cache_max_bytes
+        self.engine = engine
+
     def __call__(
         self, load_type: str,
         input_file_path: str = '',
         append: bool = False,
-        dialog: bool = False
+        dialog: bool = False,
+        columns: _ty.Optional[_ty.Dict[str, _ty.Optional[_ty.List[str]]]] = None,
+        filters: _ty.Optional[_ty.Dict[str, _ty.Dict[str, _ty.Any]]] = None
     ) -> _ty.Union[_ty.Dict[str, _pd.DataFrame], _ty.List[_ty.Tuple[str, _pd.DataFrame]]]:
         """Entry point for the Loader object.
 
@@ -67,6 +217,18 @@ class Loader:
             dialog (bool, optional):
                 Flag to control whether to use a Tkinter dialog box to load the file.
                 Defaults to False.
+            columns (_ty.Dict[str, _ty.List[str]], optional):
+                Columns to load for each content type, e.g.
+                {'labs': ['PatientID', 'LabName', 'LabValue', 'LabDateTime']}.
+                A value of None loads every column of that content type, and
+                zip file members whose content type is not a key are skipped.
+                Defaults to None (every content type and column).
+            filters (_ty.Dict[str, _ty.Dict[str, _ty.Any]], optional):
+                Row predicates for each content type, applied chunk by chunk while parsing.
+                Each column maps to either a collection of allowed values, or a
+                (from, to) tuple keeping from <= value < to, where either end may be None,
+                e.g. {'labs': {'LabName': {'CBC: HEMOGLOBIN'}, 'LabDateTime': ('2010-01-01', None)}}.
+                Defaults to None (every row).
 
         Returns:
             _ty.Union[_ty.Dict[str, _pd.DataFrame], _ty.List[_ty.Tuple[str, _pd.DataFrame]]]:
@@ -79,64 +241,23 @@ class Loader:
         if load_type in __class__.LOAD_TYPES:
             if load_type == 'example':
                 input_file_path = __class__.EXAMPLE_ZIP_PATH
-                dfs = self.__process_zipfile_load(input_file_path)
+                dfs = self.__cached_zipfile_load(input_file_path, columns, filters)
                 _LOGGER.debug('__call__: End')
                 return dfs
             else:
+                input_file_path, input_file_details = self.__resolve_input_file(
+                    load_type, input_file_path, dialog)
+                input_file_type = input_file_details['mimetype']
                 if input_file_path == '':
-                    if dialog:
-                        valid_input = False
-                        while not valid_input:
-                            input_file_path = self.__get_file_from_dialog(load_type)
-                            if input_file_path != '':
-                                input_file_type = self.__check_file_mimetype(input_file_path)
-                                if input_file_type in __class__.EMR_FILE_TYPES:
-                                    valid_input = True
-                            else:
-                                _LOGGER.warning(
-                                    'Since no file was selected by the user, '
-                                    + 'no data was loaded'
-                                )
-                                _LOGGER.debug('__call__: End')
-                                return dict()
-                    else:
-                        valid_input = False
-                        while not valid_input:
-                            input_file_path_raw = input(
-                                'Please enter the input file absolute path '
-                                + '(or "exit" to cancel): '
-                            )
-                            try:
-                                input_file_path = _os.path.realpath(input_file_path_raw)
-                                if input_file_path_raw.strip().lower() == 'exit':
-                                    _LOGGER.warning(
-                                        'Since no file was entered by the user, '
-                                        + 'no data was loaded'
-                                    )
-                                    _LOGGER.debug('__call__: End')
-                                    return dict()
-                                elif _os.path.isfile(input_file_path):
-                                    input_file_type = self.__check_file_mimetype(
-                                        input_file_path)
-                                    if input_file_type in __class__.EMR_FILE_TYPES:
-                                        _LOGGER.debug(
-                                            f'input_file_path = {input_file_path}')
-                                        valid_input = True
-                            except BaseException:
-                                _LOGGER.exception('Could not recognise the given file')
-                else:
-                    try:
-                        if _os.path.isfile(input_file_path):
-                            input_file_type = self.__check_file_mimetype(input_file_path)
-                    except BaseException:
-                        _LOGGER.exception('Could not recognise the given file')
+                    _LOGGER.debug('__call__: End')
+                    return dict()
                 if load_type == 'zip' and input_file_type == 'application/zip':
-                    dfs = self.__process_zipfile_load(input_file_path)
+                    dfs = self.__cached_zipfile_load(input_file_path, columns, filters)
                     _LOGGER.debug('__call__: End')
                     return dfs
                 elif load_type == 'text' and input_file_type == 'text/plain':
                     content_type, data = self.__process_textfile_load(
-                        input_file_path)
+                        input_file_path, columns, filters, input_file_details['header'])
                     if append:
                         _LOGGER.debug('__call__: End')
                         if content_type != '':
@@ -163,6 +284,262 @@ class Loader:
                     )
                     return dict()
 
+    def iter_chunks(
+        self, load_type: str,
+        input_file_path: str = '',
+        chunksize: int = 100000,
+        dialog: bool = False,
+        columns: _ty.Optional[_ty.Dict[str, _ty.Optional[_ty.List[str]]]] = None,
+        filters: _ty.Optional[_ty.Dict[str, _ty.Dict[str, _ty.Any]]] = None
+    ) -> _ty.Iterator[_ty.Tuple[str, _pd.DataFrame]]:
+        """Streams data from a text or zip file in fixed-size row chunks.
+
+        Uses the same filename and header detection as '__call__', but never
+        holds more than one chunk of a file in memory at a time.
+        Columns are typed by the content type 'SCHEMA' for every chunk, so
+        categorical columns may have different categories in each chunk.
+
+        Args:
+            load_type (str):
+                Controls the type of input file loading.
+                Can only be one of 'example', 'text' or 'zip'.
+            input_file_path (str, optional):
+                Absolute path of the zip or text file to load.
+                File type must match with 'load_type' argument value.
+                Argument 'dialog' is ignored when this is set.
+                Defaults to ''.
+            chunksize (int, optional):
+                Maximum number of rows in each yielded DataFrame.
+                Defaults to 100000.
+            dialog (bool, optional):
+                Flag to control whether to use a Tkinter dialog box to load the file.
+                Defaults to False.
+            columns (_ty.Dict[str, _ty.List[str]], optional):
+                Columns to load for each content type, e.g.
+                {'labs': ['PatientID', 'LabName', 'LabValue', 'LabDateTime']}.
+                A value of None loads every column of that content type, and
+                zip file members whose content type is not a key are skipped.
+                Defaults to None (every content type and column).
+            filters (_ty.Dict[str, _ty.Dict[str, _ty.Any]], optional):
+                Row predicates for each content type, applied chunk by chunk while parsing.
+                Each column maps to either a collection of allowed values, or a
+                (from, to) tuple keeping from <= value < to, where either end may be None,
+                e.g. {'labs': {'LabName': {'CBC: HEMOGLOBIN'}, 'LabDateTime': ('2010-01-01', None)}}.
+                Defaults to None (every row).
+
+        Yields:
+            content_type, data (_ty.Tuple[str, _pd.DataFrame]):
+                Tuple of the content type and a DataFrame chunk of that content type.
+        """
+        _LOGGER.debug('iter_chunks: Start')
+        load_type = load_type.lower()
+        if load_type in __class__.LOAD_TYPES:
+            if load_type == 'example':
+                input_file_path = __class__.EXAMPLE_ZIP_PATH
+                input_file_type = 'application/zip'
+            else:
+                input_file_path, input_file_details = self.__resolve_input_file(
+                    load_type, input_file_path, dialog)
+                input_file_type = input_file_details['mimetype']
+                if input_file_path == '':
+                    _LOGGER.debug('iter_chunks: End')
+                    return
+            if load_type in {'example', 'zip'} and input_file_type == 'application/zip':
+                with _zf(input_file_path, mode = 'r') as zipfile_pointer:
+                    for zipfile_entry in zipfile_pointer.infolist():
+                        filename_type = self.__get_emr_filename_type(zipfile_entry.filename)
+                        if self.__is_requested(filename_type, columns):
+                            with zipfile_pointer.open(
+                                zipfile_entry.filename, mode = 'r') as file_pointer:
+                                yield from self.__iter_textfile_chunks(
+                                    file_pointer, chunksize, columns, filters)
+            elif load_type == 'text' and input_file_type == 'text/plain':
+                with open(input_file_path, mode = 'rb') as file_pointer:
+                    yield from self.__iter_textfile_chunks(
+                        file_pointer, chunksize, columns, filters,
+                        input_file_details['header'])
+            else:
+                _LOGGER.warning(
+                    '"load_type" and "input_file_path" MIME type '
+                    + 'did not match, no data was loaded'
+                )
+        _LOGGER.debug('iter_chunks: End')
+
+    def load_shards(
+        self, shards: _ty.Union[str, _ty.List[str]],
+        dfs: _ty.Optional[_ty.Dict[str, _pd.DataFrame]] = None,
+        columns: _ty.Optional[_ty.Dict[str, _ty.Optional[_ty.List[str]]]] = None,
+        filters: _ty.Optional[_ty.Dict[str, _ty.Dict[str, _ty.Any]]] = None
+    ) -> _ty.Dict[str, _pd.DataFrame]:
+        """Loads many zip or text file shards and merges them into one dataset.
+
+        Shards are parsed in a process pool when 'workers' is above 1, and each
+        content type is concatenated once. Rows that overlap between shards are
+        deduplicated on the content type 'KEYS' (every column for labs), keeping
+        the rows from the later shard. Rows repeated within a shard are kept, and
+        nothing is deduplicated when 'columns' leaves out a key column (or any
+        labs column), as the remaining columns cannot tell rows apart.
+
+        Args:
+            shards (_ty.Union[str, _ty.List[str]]):
+                A directory (every .zip and .txt file in it), a glob pattern,
+                or a list of file paths. Shards are merged in sorted path order.
+            dfs (_ty.Dict[str, _pd.DataFrame], optional):
+                Previously loaded dataset to merge the new shards into, so that
+                adding a shard does not re-read the others. Not modified.
+                Defaults to None.
+            columns (_ty.Dict[str, _ty.List[str]], optional):
+                Columns to load for each content type. Defaults to None.
+            filters (_ty.Dict[str, _ty.Dict[str, _ty.Any]], optional):
+                Row predicates for each content type. Defaults to None.
+
+        Returns:
+            dfs (_ty.Dict[str, _pd.DataFrame]):
+                Dictionary with content type as keys and DataFrame as values.
+        """
+        _LOGGER.debug('load_shards: Start')
+        if isinstance(shards, str):
+            if _os.path.isdir(shards):
+                shard_paths = sorted(
+                    _os.path.join(shards, filename) for filename in _os.listdir(shards)
+                    if _os.path.splitext(filename)[1].lower() in {'.zip', '.txt'})
+            else:
+                shard_paths = sorted(_glob.glob(shards))
+        else:
+            shard_paths = list(shards)
+        if self.workers > 1 and len(shard_paths) > 1:
+            with _ProcessPool(max_workers = self.workers) as pool:
+                shard_dfs = list(pool.map(
+                    self._load_shard,
+                    shard_paths,
+                    [columns] * len(shard_paths),
+                    [filters] * len(shard_paths)))
+        else:
+            shard_dfs = [
+                self._load_shard(shard_path, columns, filters)
+                for shard_path in shard_paths]
+        if dfs is not None:
+            shard_dfs.insert(0, dfs)
+        frames = {}
+        for shard in shard_dfs:
+            for content_type, data in shard.items():
+                frames.setdefault(content_type, []).append(data)
+        merged_dfs = {}
+        for content_type, parts in frames.items():
+            data = _concat_emr_frames(parts)
+            if len(parts) > 1:
+                data = self.__drop_emr_duplicates(
+                    content_type, data, [len(part) for part in parts], columns)
+            merged_dfs[content_type] = data
+        _LOGGER.debug('load_shards: End')
+        return merged_dfs
+
+    def _load_shard(
+        self, shard_path: str,
+        columns: _ty.Optional[_ty.Dict[str, _ty.Optional[_ty.List[str]]]] = None,
+        filters: _ty.Optional[_ty.Dict[str, _ty.Dict[str, _ty.Any]]] = None
+    ) -> _ty.Dict[str, _pd.DataFrame]:
+        """Loads a single zip or text file shard.
+
+        Runs inside a worker process, so it is not name-mangled to keep it picklable.
+        The shard itself is loaded serially, through the cache if one is set.
+
+        Args:
+            shard_path (str):
+                Absolute path of the zip or text file to load.
+            columns (_ty.Dict[str, _ty.List[str]], optional):
+                Columns to load for each content type. Defaults to None.
+            filters (_ty.Dict[str, _ty.Dict[str, _ty.Any]], optional):
+                Row predicates for each content type. Defaults to None.
+
+        Returns:
+            dfs (_ty.Dict[str, _pd.DataFrame]):
+                Dictionary with content type as keys and DataFrame as values.
+        """
+        loader = __class__(
+            workers = 1, cache_dir = self.cache_dir,
+            cache_max_bytes = self.cache_max_bytes, engine = self.engine)
+        load_type = 'zip' if _os.path.splitext(shard_path)[1].lower() == '.zip' else 'text'
+        dfs = loader(load_type, shard_path, columns = columns, filters = filters)
+        if dfs is None:
+            _LOGGER.warning(f'Could not load shard {shard_path}')
+            dfs = {}
+        return dfs
+
+    def __resolve_input_file(
+        self, load_type: str,
+        input_file_path: str = '',
+        dialog: bool = False
+    ) -> _ty.Tuple[str, _ty.Dict[str, str]]:
+        """Determines the file to load and sniffs it.
+
+        Asks the user for a file, either by dialog box or console input,
+        when no 'input_file_path' is given.
+
+        Args:
+            load_type (str):
+                Controls the type of input file loading.
+                Can only be one of 'text' or 'zip'.
+            input_file_path (str, optional):
+                Absolute path of the zip or text file to load. Defaults to ''.
+            dialog (bool, optional):
+                Flag to control whether to use a Tkinter dialog box to load the file.
+                Defaults to False.
+
+        Returns:
+            input_file_path, input_file_details (_ty.Tuple[str, _ty.Dict[str, str]]):
+                Tuple of the file path and its details from 'sniff', so that the
+                header is not read and decoded again.
+                The file path is '' when the user cancelled the selection.
+        """
+        input_file_details = {
+            'mimetype': '', 'encoding': '', 'header': '', 'content_type': ''}
+        if input_file_path == '':
+            if dialog:
+                valid_input = False
+                while not valid_input:
+                    input_file_path = self.__get_file_from_dialog(load_type)
+                    if input_file_path != '':
+                        input_file_details = self.sniff(input_file_path)
+                        if input_file_details['mimetype'] in __class__.EMR_FILE_TYPES:
+                            valid_input = True
+                    else:
+                        _LOGGER.warning(
+                            'Since no file was selected by the user, '
+                            + 'no data was loaded'
+                        )
+                        return '', input_file_details
+            else:
+                valid_input = False
+                while not valid_input:
+                    input_file_path_raw = input(
+                        'Please enter the input file absolute path '
+                        + '(or "exit" to cancel): '
+                    )
+                    try:
+                        input_file_path = _os.path.realpath(input_file_path_raw)
+                        if input_file_path_raw.strip().lower() == 'exit':
+                            _LOGGER.warning(
+                                'Since no file was entered by the user, '
+                                + 'no data was loaded'
+                            )
+                            return '', input_file_details
+                        elif _os.path.isfile(input_file_path):
+                            input_file_details = self.sniff(input_file_path)
+                            if input_file_details['mimetype'] in __class__.EMR_FILE_TYPES:
+                                _LOGGER.debug(
+                                    f'input_file_path = {input_file_path}')
+                                valid_input = True
+                    except BaseException:
+                        _LOGGER.exception('Could not recognise the given file')
+        else:
+            try:
+                if _os.path.isfile(input_file_path):
+                    input_file_details = self.sniff(input_file_path)
+            except BaseException:
+                _LOGGER.exception('Could not recognise the given file')
+        return input_file_path, input_file_details
+
     def __get_file_from_dialog(self, load_type: str) -> str:
         """Select and load a file using a Tkinter file dialog box.
 
@@ -178,6 +555,8 @@ class Loader:
                 Absolute path of the file to load.
         """
         _LOGGER.debug('get_file_from_dialog: Start')
+        import tkinter as _tk
+        from tkinter.filedialog import askopenfilename as _tk_filedialog
         root = _tk.Tk()
         root.wm_attributes('-topmost', 1)
         root.withdraw()
@@ -197,24 +576,251 @@ class Loader:
         _LOGGER.debug('get_file_from_dialog: End')
         return input_file_path
 
-    def __check_file_mimetype(self, input_file_path: str = '') -> str:
-        """Get the MIME type of a file using the python-magic library.
+    def sniff(self, input_file_path: str) -> _ty.Dict[str, str]:
+        """Classifies a file from its first bytes in a single read.
 
-        Requires the C-language dependency libmagic to function.
+        Zip files are recognised by their signature, and text files by an
+        optional UTF-8 byte order mark and a decodable first block. UTF-16 text
+        files are reported as 'application/octet-stream', as EMR text files are
+        read as 'EMR_FILE_ENC'. The content type
+        is matched from the first non-blank line and the filename.
 
         Args:
-            input_file_path (str, optional):
-                Absolute path of the file to check. Defaults to ''.
+            input_file_path (str):
+                Absolute path of the file to check.
 
         Returns:
-            input_file_mimetype (str):
-                MIME type of the given file.
+            details (_ty.Dict[str, str]):
+                Dictionary with the keys 'mimetype', 'encoding', 'header' and
+                'content_type', where undetected values are ''.
+                The content type is taken from the header, or from the filename
+                for zip files and headerless text files.
+        """
+        details = {'mimetype': '', 'encoding': '', 'header': '', 'content_type': ''}
+        with open(input_file_path, mode = 'rb') as file_pointer:
+            head = file_pointer.read(__class__.SNIFF_BYTES)
+        details['content_type'] = self.__get_emr_filename_type(
+            _os.path.basename(input_file_path))
+        for signature, mimetype in __class__.FILE_SIGNATURES.items():
+            if head.startswith(signature):
+                details['mimetype'] = mimetype
+                return details
+        encoding = 'utf-8'
+        for bom, bom_encoding in __class__.TEXT_BOMS.items():
+            if head.startswith(bom):
+                encoding = bom_encoding
+                break
+        if encoding.startswith('utf-16'):
+            _LOGGER.warning(
+                f'{input_file_path} is {encoding} encoded, only UTF-8 text files are supported')
+            details['mimetype'] = 'application/octet-stream'
+            details['encoding'] = encoding
+            return details
+        if b'\x00' in head:
+            details['mimetype'] = 'application/octet-stream'
+            return details
+        if len(head) == __class__.SNIFF_BYTES:
+            head = head[:head.rfind(b'\n') + 1]
+        try:
+            text = head.decode(encoding)
+        except UnicodeDecodeError:
+            details['mimetype'] = 'application/octet-stream'
+            return details
+        details['mimetype'] = 'text/plain'
+        details['encoding'] = encoding
+        for line in text.splitlines():
+            if len(line.strip()) > 0:
+                details['header'] = line.strip()
+                break
+        header_type = self.__get_emr_content_type(details['header'])
+        if header_type != '':
+            details['content_type'] = header_type
+        return details
+
+    def __cached_zipfile_load(
+        self, zipfile_path: str = '',
+        columns: _ty.Optional[_ty.Dict[str, _ty.Optional[_ty.List[str]]]] = None,
+        filters: _ty.Optional[_ty.Dict[str, _ty.Dict[str, _ty.Any]]] = None
+    ) -> _ty.Dict[str, _pd.DataFrame]:
+        """Loads the given zip file through the on-disk cache, if enabled.
+
+        Only full loads are cached, loads with 'columns' or 'filters' always
+        read from the zip file.
+
+        Args:
+            zipfile_path (str, optional):
+                Absolute path to the given zip file. Defaults to ''.
+            columns (_ty.Dict[str, _ty.List[str]], optional):
+                Columns to load for each content type. Defaults to None.
+            filters (_ty.Dict[str, _ty.Dict[str, _ty.Any]], optional):
+                Row predicates for each content type. Defaults to None.
+
+        Returns:
+            dfs (_ty.Dict[str, _pd.DataFrame]):
+                Dictionary with content type as keys and DataFrame as values.
+        """
+        if self.cache_dir is None or columns is not None or filters is not None:
+            return self.__process_zipfile_load(zipfile_path, columns, filters)
+        dfs, cache_key = None, None
+        try:
+            cache_key = self.__get_cache_key(zipfile_path)
+            dfs = self.__load_from_cache(cache_key)
+        except BaseException:
+            _LOGGER.exception('Could not read the cache, loading from file')
+        if dfs is None:
+            dfs = self.__process_zipfile_load(zipfile_path)
+            if dfs and cache_key is not None:
+                try:
+                    self.__save_to_cache(cache_key, dfs)
+                    self.__evict_cache()
+                except BaseException:
+                    _LOGGER.exception('Could not write the cache')
+        return dfs
+
+    def __get_cache_key(self, input_file_path: str) -> str:
+        """Fingerprints a file by its path, size, modification time and content hash.
+
+        Args:
+            input_file_path (str):
+                Absolute path of the file to fingerprint.
+
+        Returns:
+            cache_key (str):
+                Hex digest identifying the file contents at its current location.
+        """
+        input_file_path = _os.path.realpath(input_file_path)
+        stat = _os.stat(input_file_path)
+        content_hash = _hashlib.blake2b(digest_size = 16)
+        with open(input_file_path, mode = 'rb') as file_pointer:
+            for block in iter(lambda: file_pointer.read(1024 * 1024), b''):
+                content_hash.update(block)
+        fingerprint = (
+            f'{input_file_path}|{stat.st_size}|{stat.st_mtime_ns}|'
+            + f'{content_hash.hexdigest()}')
+        cache_key = _hashlib.blake2b(
+            fingerprint.encode(), digest_size = 16).hexdigest()
+        return cache_key
+
+    def __load_from_cache(
+        self, cache_key: str) -> _ty.Optional[_ty.Dict[str, _pd.DataFrame]]:
+        """Loads a cache entry, memory-mapping its NumPy column files.
+
+        Numeric and datetime columns stay memory-mapped, copy-on-write so that
+        editing the DataFrame never writes to the cache. Each column is its own
+        block, as the DataFrame constructor would copy them into one.
+
+        Args:
+            cache_key (str):
+                Key returned by '__get_cache_key'.
+
+        Returns:
+            dfs (_ty.Optional[_ty.Dict[str, _pd.DataFrame]]):
+                Dictionary with content type as keys and DataFrame as values,
+                or None if there is no cache entry for the key.
+        """
+        entry_path = _os.path.join(self.cache_dir, cache_key)
+        manifest_path = _os.path.join(entry_path, 'manifest.json')
+        if not _os.path.isfile(manifest_path):
+            return None
+        _LOGGER.debug(f'Loading from cache entry {entry_path}')
+        with open(manifest_path, mode = 'r') as file_pointer:
+            manifest = _json.load(file_pointer)
+        dfs = {}
+        for content_type, columns in manifest.items():
+            data = {}
+            for i, column in enumerate(columns):
+                column_path = _os.path.join(entry_path, content_type, str(i))
+                values = _np.load(f'{column_path}.npy', mmap_mode = 'c')
+                if column['kind'] == 'values':
+                    data[column['name']] = values
+                else:
+                    categories = _np.load(f'{column_path}.categories.npy')
+                    values = _pd.Categorical.from_codes(
+                        values,
+                        categories = categories.astype(object),
+                        ordered = column['kind'] == 'ordered')
+                    if column['kind'] == 'object':
+                        values = _np.asarray(values.astype(object))
+                    data[column['name']] = values
+            if data:
+                dfs[content_type] = _pd.concat(
+                    [_pd.Series(values, name = name, copy = False)
+                     for name, values in data.items()],
+                    axis = 1, copy = False)
+            else:
+                dfs[content_type] = _pd.DataFrame()
+        _os.utime(manifest_path)
+        return dfs
+
+    def __save_to_cache(self, cache_key: str, dfs: _ty.Dict[str, _pd.DataFrame]) -> None:
+        """Writes each DataFrame column to a NumPy file in a new cache entry.
+
+        Numeric and datetime columns are saved as they are. Categorical and
+        string columns are saved as integer codes with their categories.
+
+        Args:
+            cache_key (str):
+                Key returned by '__get_cache_key'.
+            dfs (_ty.Dict[str, _pd.DataFrame]):
+                Dictionary with content type as keys and DataFrame as values.
         """
-        input_file_mimetype = _magic_from_file(input_file_path, mime = True)
-        return input_file_mimetype
+        entry_path = _os.path.join(self.cache_dir, cache_key)
+        temp_path = f'{entry_path}.{_os.getpid()}.tmp'
+        manifest = {}
+        for content_type, data in dfs.items():
+            _os.makedirs(_os.path.join(temp_path, content_type))
+            manifest[content_type] = []
+            for i, column in enumerate(data.columns):
+                column_path = _os.path.join(temp_path, content_type, str(i))
+                values = data[column]
+                if isinstance(values.dtype, _pd.CategoricalDtype):
+                    kind = 'ordered' if values.cat.ordered else 'category'
+                    codes = values.cat.codes.to_numpy()
+                    categories = values.cat.categories.to_numpy()
+                elif values.dtype == object:
+                    kind = 'object'
+                    codes, categories = _pd.factorize(values)
+                else:
+                    kind = 'values'
+                    codes = values.to_numpy()
+                _np.save(f'{column_path}.npy', codes, allow_pickle = False)
+                if kind != 'values':
+                    _np.save(
+                        f'{column_path}.categories.npy',
+                        _np.asarray(categories, dtype = str), allow_pickle = False)
+                manifest[content_type].append({'name': column, 'kind': kind})
+        with open(_os.path.join(temp_path, 'manifest.json'), mode = 'w') as file_pointer:
+            _json.dump(manifest, file_pointer)
+        if _os.path.isdir(entry_path):
+            _shutil.rmtree(temp_path)
+        else:
+            _os.replace(temp_path, entry_path)
+
+    def __evict_cache(self) -> None:
+        """Removes least recently used cache entries until 'cache_max_bytes' is met."""
+        entries = []
+        for cache_key in _os.listdir(self.cache_dir):
+            entry_path = _os.path.join(self.cache_dir, cache_key)
+            manifest_path = _os.path.join(entry_path, 'manifest.json')
+            if _os.path.isfile(manifest_path):
+                entry_bytes = sum(
+                    _os.path.getsize(_os.path.join(root, filename))
+                    for root, _, filenames in _os.walk(entry_path)
+                    for filename in filenames)
+                entries.append((_os.path.getmtime(manifest_path), entry_bytes, entry_path))
+        total_bytes = sum(entry_bytes for _, entry_bytes, _ in entries)
+        for _, entry_bytes, entry_path in sorted(entries):
+            if total_bytes <= self.cache_max_bytes:
+                break
+            _LOGGER.debug(f'Evicting cache entry {entry_path}')
+            _shutil.rmtree(entry_path, ignore_errors = True)
+            total_bytes -= entry_bytes
 
     def __process_zipfile_load(
-        self, zipfile_path: str = '') -> _ty.Dict[str, _pd.DataFrame]:
+        self, zipfile_path: str = '',
+        columns: _ty.Optional[_ty.Dict[str, _ty.Optional[_ty.List[str]]]] = None,
+        filters: _ty.Optional[_ty.Dict[str, _ty.Dict[str, _ty.Any]]] = None
+    ) -> _ty.Dict[str, _pd.DataFrame]:
         """Processes the given zip file to load data from.
 
         Searches for text files matching the required data to load data from.
@@ -222,6 +828,10 @@ class Loader:
         Args:
             zipfile_path (str, optional):
                 Absolute path to the given zip file. Defaults to ''.
+            columns (_ty.Dict[str, _ty.List[str]], optional):
+                Columns to load for each content type. Defaults to None.
+            filters (_ty.Dict[str, _ty.Dict[str, _ty.Any]], optional):
+                Row predicates for each content type. Defaults to None.
 
         Returns:
             dfs (_ty.Dict[str, _pd.DataFrame]):
@@ -230,31 +840,189 @@ class Loader:
         _LOGGER.debug('process_zipfile_load: Start')
         try:
             dfs = {}
-            with _zf(zipfile_path, mode = 'r') as zipfile_pointer:
-                zipfile_contents = zipfile_pointer.infolist()
-                for zipfile_entry in zipfile_contents:
-                    filename_type = ''
-                    for fn_type, pattern in __class__.EMR_PATTERNS.items():
-                        if bool(_re.match(pattern['FILENAME'], zipfile_entry.filename)):
-                            filename_type = fn_type
-                    if filename_type != '':
-                        with zipfile_pointer.open(
-                            zipfile_entry.filename, mode = 'r') as file_pointer:
-                            content_type, data = self.__extract_data_from_textfile(
-                                file_pointer)
-                            dfs[content_type] = data
+            if self.workers > 1:
+                dfs = self.__process_zipfile_load_parallel(zipfile_path, columns, filters)
+            else:
+                with _zf(zipfile_path, mode = 'r') as zipfile_pointer:
+                    zipfile_contents = zipfile_pointer.infolist()
+                    for zipfile_entry in zipfile_contents:
+                        filename_type = self.__get_emr_filename_type(zipfile_entry.filename)
+                        if self.__is_requested(filename_type, columns):
+                            with zipfile_pointer.open(
+                                zipfile_entry.filename, mode = 'r') as file_pointer:
+                                content_type, data = self.__extract_data_from_textfile(
+                                    file_pointer, columns, filters)
+                                dfs[content_type] = data
             _LOGGER.debug('process_zipfile_load: End')
             return dfs
         except BaseException:
             _LOGGER.exception('Could not process the given zip file')
 
+    def __process_zipfile_load_parallel(
+        self, zipfile_path: str = '',
+        columns: _ty.Optional[_ty.Dict[str, _ty.Optional[_ty.List[str]]]] = None,
+        filters: _ty.Optional[_ty.Dict[str, _ty.Dict[str, _ty.Any]]] = None
+    ) -> _ty.Dict[str, _pd.DataFrame]:
+        """Processes the given zip file using a pool of worker processes.
+
+        Every matching member is parsed in its own task, and members larger than
+        'SPLIT_MIN_BYTES' are split into up to 'workers' byte ranges.
+        The result is identical to the serial load.
+
+        Args:
+            zipfile_path (str, optional):
+                Absolute path to the given zip file. Defaults to ''.
+            columns (_ty.Dict[str, _ty.List[str]], optional):
+                Columns to load for each content type. Defaults to None.
+            filters (_ty.Dict[str, _ty.Dict[str, _ty.Any]], optional):
+                Row predicates for each content type. Defaults to None.
+
+        Returns:
+            dfs (_ty.Dict[str, _pd.DataFrame]):
+                Dictionary with content type as keys and DataFrame as values.
+        """
+        _LOGGER.debug('process_zipfile_load_parallel: Start')
+        tasks = []
+        with _zf(zipfile_path, mode = 'r') as zipfile_pointer:
+            for zipfile_entry in zipfile_pointer.infolist():
+                filename_type = self.__get_emr_filename_type(zipfile_entry.filename)
+                if self.__is_requested(filename_type, columns):
+                    n_ranges = min(
+                        self.workers,
+                        max(1, zipfile_entry.file_size // __class__.SPLIT_MIN_BYTES))
+                    range_size = -(-zipfile_entry.file_size // n_ranges)
+                    for i in range(n_ranges):
+                        tasks.append((
+                            zipfile_entry.filename,
+                            i * range_size,
+                            min((i + 1) * range_size, zipfile_entry.file_size)))
+        members = {}
+        with _ProcessPool(max_workers = self.workers) as pool:
+            results = pool.map(
+                self._load_zipfile_range,
+                [zipfile_path] * len(tasks),
+                *zip(*tasks),
+                [columns] * len(tasks),
+                [filters] * len(tasks))
+            for (member, _, _), (content_type, data) in zip(tasks, results):
+                members.setdefault(member, []).append((content_type, data))
+        dfs = {}
+        for parts in members.values():
+            content_type = parts[0][0]
+            dfs[content_type] = _concat_emr_frames([data for _, data in parts])
+        _LOGGER.debug('process_zipfile_load_parallel: End')
+        return dfs
+
+    def _load_zipfile_range(
+        self, zipfile_path: str, member: str,
+        start: int, end: int,
+        columns: _ty.Optional[_ty.Dict[str, _ty.Optional[_ty.List[str]]]] = None,
+        filters: _ty.Optional[_ty.Dict[str, _ty.Dict[str, _ty.Any]]] = None
+    ) -> _ty.Tuple[str, _pd.DataFrame]:
+        """Loads the lines of a zip file member that start within a byte range.
+
+        Runs inside a worker process, so it is not name-mangled to keep it picklable.
+        Ranges after the first are parsed with the member header line prepended.
+
+        Args:
+            zipfile_path (str):
+                Absolute path to the given zip file.
+            member (str):
+                Name of the text file inside the zip file.
+            start (int):
+                First uncompressed byte offset of the range.
+            end (int):
+                Uncompressed byte offset where the range stops.
+            columns (_ty.Dict[str, _ty.List[str]], optional):
+                Columns to load for each content type. Defaults to None.
+            filters (_ty.Dict[str, _ty.Dict[str, _ty.Any]], optional):
+                Row predicates for each content type. Defaults to None.
+
+        Returns:
+            content_type, data (_ty.Tuple[str, _pd.DataFrame]):
+                Tuple of the content type and the DataFrame of the range.
+        """
+        with _zf(zipfile_path, mode = 'r') as zipfile_pointer:
+            with zipfile_pointer.open(member, mode = 'r') as file_pointer:
+                header_line = b''
+                if start > 0:
+                    for line in file_pointer:
+                        if len(line.strip()) > 0:
+                            header_line = line
+                            break
+                    file_pointer.seek(start - 1)
+                    file_pointer.readline()
+                position = file_pointer.tell()
+                chunk = file_pointer.read(max(0, end - position))
+                if len(chunk) > 0 and not chunk.endswith(b'\n'):
+                    chunk += file_pointer.readline()
+        return self.__extract_data_from_textfile(
+            _BytesIO(header_line + chunk), columns, filters)
+
+    def _load_textfile_tail(
+        self, textfile_path: str, start: int = 0,
+        header_line: bytes = b'',
+        columns: _ty.Optional[_ty.Dict[str, _ty.Optional[_ty.List[str]]]] = None,
+        filters: _ty.Optional[_ty.Dict[str, _ty.Dict[str, _ty.Any]]] = None
+    ) -> _ty.Tuple[str, _pd.DataFrame, bytes, int]:
+        """Loads the complete lines of a text file from a byte offset onwards.
+
+        A trailing line without a newline is left for the next call, since it
+        may still be being written.
+
+        Args:
+            textfile_path (str):
+                Absolute path to the given text file.
+            start (int, optional):
+                Byte offset to read from, at a line boundary. Defaults to 0.
+            header_line (bytes, optional):
+                Raw header line of the file, required when 'start' is above 0.
+                Defaults to b''.
+            columns (_ty.Dict[str, _ty.List[str]], optional):
+                Columns to load for each content type. Defaults to None.
+            filters (_ty.Dict[str, _ty.Dict[str, _ty.Any]], optional):
+                Row predicates for each content type. Defaults to None.
+
+        Returns:
+            content_type, data, header_line, end (_ty.Tuple[str, _pd.DataFrame, bytes, int]):
+                Tuple of the content type, the DataFrame of the new rows,
+                the raw header line and the byte offset to read from next time.
+        """
+        with open(textfile_path, mode = 'rb') as file_pointer:
+            file_pointer.seek(start)
+            chunk = file_pointer.read()
+        chunk = chunk[:chunk.rfind(b'\n') + 1]
+        end = start + len(chunk)
+        if start == 0:
+            for line in chunk.splitlines(keepends = True):
+                if len(line.strip()) > 0:
+                    header_line = line
+                    break
+        if len(chunk.strip()) == 0 or header_line == b'':
+            return '', _pd.DataFrame(), header_line, start
+        if start > 0:
+            chunk = header_line + chunk
+        content_type, data = self.__extract_data_from_textfile(
+            _BytesIO(chunk), columns, filters)
+        return content_type, data, header_line, end
+
     def __process_textfile_load(
-            self, textfile_path: str = '') -> _ty.Tuple[str, _pd.DataFrame]:
+            self, textfile_path: str = '',
+            columns: _ty.Optional[_ty.Dict[str, _ty.Optional[_ty.List[str]]]] = None,
+            filters: _ty.Optional[_ty.Dict[str, _ty.Dict[str, _ty.Any]]] = None,
+            header: _ty.Optional[str] = None
+    ) -> _ty.Tuple[str, _pd.DataFrame]:
         """Processes the given text file to load data from.
 
         Args:
             textfile_path (str):
                 Absolute path to the given text file. Defaults to ''.
+            columns (_ty.Dict[str, _ty.List[str]], optional):
+                Columns to load for each content type. Defaults to None.
+            filters (_ty.Dict[str, _ty.Dict[str, _ty.Any]], optional):
+                Row predicates for each content type. Defaults to None.
+            header (str, optional):
+                Header line already found by 'sniff'. Defaults to None.
 
         Returns:
             content_type, data (_ty.Tuple[str, _pd.DataFrame]):
@@ -263,12 +1031,10 @@ class Loader:
         _LOGGER.debug('process_textfile_load: Start')
         try:
             with open(textfile_path, mode = 'rb') as file_pointer:
-                header = self.__check_textfile_header(file_pointer)
-                if header != '':
-                    content_type, data = self.__extract_data_from_textfile(
-                        file_pointer)
-                    _LOGGER.debug('process_textfile_load: End')
-                    return content_type, data
+                content_type, data = self.__extract_data_from_textfile(
+                    file_pointer, columns, filters, header)
+                _LOGGER.debug('process_textfile_load: End')
+                return content_type, data
         except BaseException:
             _LOGGER.exception('Could not process the given text file')
 
@@ -285,38 +1051,257 @@ class Loader:
             _LOGGER.exception('Could not decode the textfile header line')
 
     def __extract_data_from_textfile(
-            self, file_pointer: _ty.TextIO) -> _ty.Tuple[str, _pd.DataFrame]:
+            self, file_pointer: _ty.TextIO,
+            columns: _ty.Optional[_ty.Dict[str, _ty.Optional[_ty.List[str]]]] = None,
+            filters: _ty.Optional[_ty.Dict[str, _ty.Dict[str, _ty.Any]]] = None,
+            header: _ty.Optional[str] = None
+    ) -> _ty.Tuple[str, _pd.DataFrame]:
         """Reads through the file and converts it to a Pandas DataFrame.
 
+        When row filters are given for the content type, the file is parsed
+        in chunks of 'CHUNKSIZE' rows and each chunk is filtered before the next is read.
+
         Args:
             file_pointer (_ty.TextIO):
                 File-like object used to read through the file.
+            columns (_ty.Dict[str, _ty.List[str]], optional):
+                Columns to load for each content type. Defaults to None.
+            filters (_ty.Dict[str, _ty.Dict[str, _ty.Any]], optional):
+                Row predicates for each content type. Defaults to None.
+            header (str, optional):
+                Header line already found by 'sniff', read from the file if None or ''.
+                Defaults to None.
 
         Returns:
             content_type, data (_ty.Tuple[str, _pd.DataFrame]):
                 Tuple of the content type and the corresponding DataFrame.
         """
         _LOGGER.debug('extract_data_from_textfile: Start')
-        header = self.__check_textfile_header(file_pointer)
+        if not header:
+            header = self.__check_textfile_header(file_pointer)
         if header is not None and header != '':
             data = _pd.DataFrame()
             try:
                 content_type = self.__get_emr_content_type(header)
                 if content_type is not None and content_type != '':
-                    data = _pd.read_csv(
-                        file_pointer,
+                    read_options = dict(
                         delimiter = '\t',
-                        encoding = __class__.EMR_FILE_ENC)
+                        encoding = __class__.EMR_FILE_ENC,
+                        dtype = self.__get_emr_dtypes(content_type, header),
+                        usecols = self.__get_emr_usecols(
+                            content_type, header, columns, filters))
+                    if filters is not None and filters.get(content_type):
+                        with _pd.read_csv(
+                            file_pointer,
+                            chunksize = __class__.CHUNKSIZE,
+                            **read_options) as reader:
+                            data = _concat_emr_frames([
+                                self.__select_emr_rows(
+                                    content_type,
+                                    self.__parse_emr_dates(content_type, chunk),
+                                    columns, filters)
+                                for chunk in reader])
+                    elif self.engine == 'pyarrow':
+                        data = self.__read_csv_pyarrow(
+                            content_type, file_pointer, **read_options)
+                        data = self.__parse_emr_dates(content_type, data)
+                    else:
+                        data = _pd.read_csv(file_pointer, **read_options)
+                        data = self.__parse_emr_dates(content_type, data)
                     _LOGGER.debug('extract_data_from_textfile: End')
             except BaseException:
                 _LOGGER.exception('Could not read data from the given file')
             finally:
                 return content_type, data
+        return '', _pd.DataFrame()
+
+    def __read_csv_pyarrow(
+        self, content_type: str,
+        file_pointer: _ty.TextIO,
+        delimiter: str,
+        encoding: str,
+        dtype: _ty.Dict[str, str],
+        usecols: _ty.Optional[_ty.List[str]]
+    ) -> _pd.DataFrame:
+        """Reads a whole file with the multithreaded pyarrow.csv parser.
+
+        Takes the same arguments as the pandas read, and gives the same DataFrame:
+        date and categorical columns are read as strings and converted by pandas,
+        and compact numeric columns are downcast after parsing.
+
+        Args:
+            content_type (str):
+                One of the supported content types.
+            file_pointer (_ty.TextIO):
+                File-like object used to read through the file.
+            delimiter (str):
+                Column delimiter.
+            encoding (str):
+                Text encoding of the file.
+            dtype (_ty.Dict[str, str]):
+                Dictionary with column names as keys and dtypes as values.
+            usecols (_ty.Optional[_ty.List[str]]):
+                Column names in file order, or None to parse every column.
+
+        Returns:
+            data (_pd.DataFrame):
+                DataFrame of the file contents.
+        """
+        import pyarrow as _pa
+        import pyarrow.csv as _pa_csv
+
+        column_types = {
+            column: _pa.string() for column, column_dtype in dtype.items()
+            if column_dtype in {'category', 'object', 'str'}}
+        for column in __class__.EMR_PATTERNS[content_type]['SCHEMA']['DATES']:
+            column_types[column] = _pa.string()
+        table = _pa_csv.read_csv(
+            file_pointer,
+            read_options = _pa_csv.ReadOptions(
+                encoding = 'utf8' if encoding == __class__.EMR_FILE_ENC else encoding),
+            parse_options = _pa_csv.ParseOptions(delimiter = delimiter),
+            convert_options = _pa_csv.ConvertOptions(
+                column_types = column_types,
+                include_columns = usecols,
+                strings_can_be_null = True))
+        data = table.to_pandas()
+        data = data.astype({
+            column: column_dtype for column, column_dtype in dtype.items()
+            if column in data.columns})
+        return data
+
+    def __iter_textfile_chunks(
+            self, file_pointer: _ty.TextIO,
+            chunksize: int,
+            columns: _ty.Optional[_ty.Dict[str, _ty.Optional[_ty.List[str]]]] = None,
+            filters: _ty.Optional[_ty.Dict[str, _ty.Dict[str, _ty.Any]]] = None,
+            header: _ty.Optional[str] = None
+    ) -> _ty.Iterator[_ty.Tuple[str, _pd.DataFrame]]:
+        """Reads through the file and yields it as Pandas DataFrame chunks.
+
+        Args:
+            file_pointer (_ty.TextIO):
+                File-like object used to read through the file.
+            chunksize (int):
+                Maximum number of rows in each yielded DataFrame.
+            columns (_ty.Dict[str, _ty.List[str]], optional):
+                Columns to load for each content type. Defaults to None.
+            filters (_ty.Dict[str, _ty.Dict[str, _ty.Any]], optional):
+                Row predicates for each content type. Defaults to None.
+            header (str, optional):
+                Header line already found by 'sniff', read from the file if None or ''.
+                Defaults to None.
+
+        Yields:
+            content_type, data (_ty.Tuple[str, _pd.DataFrame]):
+                Tuple of the content type and a DataFrame chunk of that content type.
+        """
+        _LOGGER.debug('iter_textfile_chunks: Start')
+        if not header:
+            header = self.__check_textfile_header(file_pointer)
+        content_type = self.__get_emr_content_type(header)
+        if content_type != '':
+            try:
+                with _pd.read_csv(
+                    file_pointer,
+                    delimiter = '\t',
+                    encoding = __class__.EMR_FILE_ENC,
+                    dtype = self.__get_emr_dtypes(content_type, header),
+                    usecols = self.__get_emr_usecols(
+                        content_type, header, columns, filters),
+                    chunksize = chunksize) as reader:
+                    for data in reader:
+                        data = self.__parse_emr_dates(content_type, data)
+                        data = self.__select_emr_rows(content_type, data, columns, filters)
+                        if len(data) > 0:
+                            yield content_type, data
+            except GeneratorExit:
+                raise
+            except BaseException:
+                _LOGGER.exception('Could not read data from the given file')
+        _LOGGER.debug('iter_textfile_chunks: End')
+
+    def __get_emr_usecols(
+        self, content_type: str, header: str,
+        columns: _ty.Optional[_ty.Dict[str, _ty.Optional[_ty.List[str]]]] = None,
+        filters: _ty.Optional[_ty.Dict[str, _ty.Dict[str, _ty.Any]]] = None
+    ) -> _ty.Optional[_ty.List[str]]:
+        """Get the columns to parse for a content type.
+
+        These are the requested columns plus any columns needed by the row filters.
+
+        Args:
+            content_type (str):
+                One of the supported content types.
+            header (str):
+                Header line of a text file.
+            columns (_ty.Dict[str, _ty.List[str]], optional):
+                Columns to load for each content type. Defaults to None.
+            filters (_ty.Dict[str, _ty.Dict[str, _ty.Any]], optional):
+                Row predicates for each content type. Defaults to None.
+
+        Returns:
+            usecols (_ty.Optional[_ty.List[str]]):
+                Column names in file order, or None to parse every column.
+        """
+        if columns is None or columns.get(content_type) is None:
+            return None
+        header_columns = header.split('\t')
+        wanted = set(columns[content_type])
+        if filters is not None:
+            wanted.update(filters.get(content_type, {}).keys())
+        for column in wanted - set(header_columns):
+            _LOGGER.warning(f'Column "{column}" is not in the {content_type} file header')
+        usecols = [column for column in header_columns if column in wanted]
+        return usecols
+
+    def __select_emr_rows(
+        self, content_type: str, data: _pd.DataFrame,
+        columns: _ty.Optional[_ty.Dict[str, _ty.Optional[_ty.List[str]]]] = None,
+        filters: _ty.Optional[_ty.Dict[str, _ty.Dict[str, _ty.Any]]] = None
+    ) -> _pd.DataFrame:
+        """Applies the row filters of a content type, then drops filter-only columns.
+
+        Args:
+            content_type (str):
+                One of the supported content types.
+            data (_pd.DataFrame):
+                DataFrame (or chunk) of the given content type.
+            columns (_ty.Dict[str, _ty.List[str]], optional):
+                Columns to load for each content type. Defaults to None.
+            filters (_ty.Dict[str, _ty.Dict[str, _ty.Any]], optional):
+                Row predicates for each content type. Defaults to None.
+
+        Returns:
+            data (_pd.DataFrame):
+                The selected rows and columns, with a fresh RangeIndex if filtered.
+        """
+        content_filters = {} if filters is None else filters.get(content_type, {})
+        if content_filters:
+            mask = _np.ones(len(data), dtype = bool)
+            for column, condition in content_filters.items():
+                values = data[column]
+                if isinstance(condition, tuple):
+                    lower, upper = condition
+                    if _pd.api.types.is_datetime64_any_dtype(values.dtype):
+                        lower = None if lower is None else _pd.Timestamp(lower)
+                        upper = None if upper is None else _pd.Timestamp(upper)
+                    if lower is not None:
+                        mask &= (values >= lower).to_numpy()
+                    if upper is not None:
+                        mask &= (values < upper).to_numpy()
+                else:
+                    mask &= values.isin(condition).to_numpy()
+            data = data[mask].reset_index(drop = True)
+        if columns is not None and columns.get(content_type) is not None:
+            wanted = set(columns[content_type])
+            data = data[[column for column in data.columns if column in wanted]]
+        return data
 
     def __get_emr_content_type(self, header: str) -> str:
         """Check text file header against supported header patterns.
 
-        Uses regex to match header string against supported header patterns.
+        Uses a single regex alternation of all supported header patterns.
 
         Args:
             header (str):
@@ -328,8 +1313,238 @@ class Loader:
         """
         content_type = ''
         if header is not None and header != '':
-            for c_type, pattern in __class__.EMR_PATTERNS.items():
-                if bool(_re.match(pattern['HEADER'], header)):
-                    content_type = c_type
-                    break
+            match = __class__.EMR_HEADER_PATTERN.match(header)
+            if match is not None:
+                content_type = match.lastgroup
         return content_type
+
+    def __get_emr_filename_type(self, filename: str) -> str:
+        """Check a filename against supported filename patterns.
+
+        Uses a single regex alternation of all supported filename patterns.
+
+        Args:
+            filename (str):
+                Name of a text file, e.g. a zip file member.
+
+        Returns:
+            filename_type (str):
+                One of the supported content types determined from pattern matching.
+        """
+        filename_type = ''
+        match = __class__.EMR_FILENAME_PATTERN.match(filename)
+        if match is not None:
+            filename_type = match.lastgroup
+        return filename_type
+
+    def __get_emr_dtypes(self, content_type: str, header: str) -> _ty.Dict[str, str]:
+        """Get the schema column dtypes present in a text file header.
+
+        Args:
+            content_type (str):
+                One of the supported content types.
+            header (str):
+                Header line of a text file.
+
+        Returns:
+            dtypes (_ty.Dict[str, str]):
+                Dictionary with column names as keys and dtypes as values.
+        """
+        columns = set(header.split('\t'))
+        schema = __class__.EMR_PATTERNS[content_type]['SCHEMA']
+        dtypes = {
+            column: dtype for column, dtype in schema['DTYPES'].items()
+            if column in columns}
+        return dtypes
+
+    def __parse_emr_dates(self, content_type: str, data: _pd.DataFrame) -> _pd.DataFrame:
+        """Converts the schema date columns of a DataFrame to datetime64.
+
+        Dates are parsed with 'EMR_DATE_FORMAT', falling back to inferred
+        parsing if a column does not match it.
+
+        Args:
+            content_type (str):
+                One of the supported content types.
+            data (_pd.DataFrame):
+                DataFrame read from a text file of the given content type.
+
+        Returns:
+            data (_pd.DataFrame):
+                The same DataFrame with its date columns converted.
+        """
+        schema = __class__.EMR_PATTERNS[content_type]['SCHEMA']
+        for column in schema['DATES']:
+            if column in data.columns:
+                try:
+                    data[column] = _pd.to_datetime(
+                        data[column], format = __class__.EMR_DATE_FORMAT)
+                except ValueError:
+                    _LOGGER.debug(f'{column} did not match EMR_DATE_FORMAT')
+                    data[column] = _pd.to_datetime(data[column])
+        return data
+
+    def __is_requested(
+        self, filename_type: str,
+        columns: _ty.Optional[_ty.Dict[str, _ty.Optional[_ty.List[str]]]] = None) -> bool:
+        """Check whether a zip file member of the given content type should be loaded.
+
+        Args:
+            filename_type (str):
+                Content type determined from the member filename.
+            columns (_ty.Dict[str, _ty.List[str]], optional):
+                Columns to load for each content type. Defaults to None.
+
+        Returns:
+            bool:
+                True if the member matches an EMR pattern and its content type is requested.
+        """
+        return filename_type != '' and (columns is None or filename_type in columns)
+
+    def __drop_emr_duplicates(
+        self, content_type: str, data: _pd.DataFrame, shard_sizes: _ty.List[int],
+        columns: _ty.Optional[_ty.Dict[str, _ty.Optional[_ty.List[str]]]] = None
+    ) -> _pd.DataFrame:
+        """Removes rows whose key is repeated in a later shard.
+
+        Args:
+            content_type (str):
+                One of the supported content types.
+            data (_pd.DataFrame):
+                Concatenated DataFrame of the given content type.
+            shard_sizes (_ty.List[int]):
+                Number of rows of each shard in 'data', in order.
+            columns (_ty.Dict[str, _ty.List[str]], optional):
+                Columns loaded for each content type. Defaults to None.
+
+        Returns:
+            data (_pd.DataFrame):
+                DataFrame with each key from one shard only, with a fresh RangeIndex.
+        """
+        keys = __class__.EMR_PATTERNS[content_type]['SCHEMA']['KEYS']
+        if keys is None:
+            # Without keys only a whole row identifies a measurement
+            if columns is not None and columns.get(content_type) is not None:
+                return data
+            keys = list(data.columns)
+        elif not set(keys).issubset(data.columns):
+            return data
+        shard = _np.repeat(_np.arange(len(shard_sizes)), shard_sizes)
+        key_codes = [
+            _pd.Series(_pd.factorize(data[key])[0], name = key) for key in keys]
+        last_shard = (_pd.Series(shard)
+                      .groupby(key_codes, sort = False)
+                      .transform('max')
+                      .to_numpy())
+        data = data[shard == last_shard].reset_index(drop = True)
+        return data
+
+
+class IncrementalLoader:
+    """Keeps EMR text files loaded as new rows are appended to them.
+    Each refresh only parses the bytes added since the previous one.
+    """
+
+    def __init__(
+        self, input_file_paths: _ty.Union[str, _ty.List[str]],
+        loader: _ty.Optional[Loader] = None,
+        columns: _ty.Optional[_ty.Dict[str, _ty.Optional[_ty.List[str]]]] = None,
+        filters: _ty.Optional[_ty.Dict[str, _ty.Dict[str, _ty.Any]]] = None
+    ) -> None:
+        """Initializes the IncrementalLoader object.
+
+        No data is read until the first call to 'refresh'.
+
+        Args:
+            input_file_paths (_ty.Union[str, _ty.List[str]]):
+                Absolute path, or list of paths, of the text files to follow.
+            loader (Loader, optional):
+                Loader used to parse the files. Defaults to None (a new Loader).
+            columns (_ty.Dict[str, _ty.List[str]], optional):
+                Columns to load for each content type. Defaults to None.
+            filters (_ty.Dict[str, _ty.Dict[str, _ty.Any]], optional):
+                Row predicates for each content type. Defaults to None.
+        """
+        if isinstance(input_file_paths, str):
+            input_file_paths = [input_file_paths]
+        self.loader = Loader() if loader is None else loader
+        self.columns = columns
+        self.filters = filters
+        self.dfs = {}
+        self.__files = {
+            input_file_path: {'offset': 0, 'header': b'', 'content_type': '', 'data': None}
+            for input_file_path in input_file_paths}
+
+    def refresh(self) -> _ty.Dict[str, _pd.DataFrame]:
+        """Parses the rows appended to each file since the last refresh.
+
+        A file that has shrunk, or whose header changed, is reloaded from the start.
+        The attribute 'dfs' is updated with the new rows.
+
+        Returns:
+            new_dfs (_ty.Dict[str, _pd.DataFrame]):
+                Dictionary with content type as keys and DataFrame of only
+                the new rows as values.
+        """
+        _LOGGER.debug('refresh: Start')
+        new_frames, changed_types = {}, set()
+        for input_file_path, state in self.__files.items():
+            try:
+                file_size = _os.path.getsize(input_file_path)
+                if file_size < state['offset'] or not self.__header_unchanged(
+                        input_file_path, state['header']):
+                    _LOGGER.info(f'{input_file_path} was truncated or replaced, reloading it')
+                    changed_types.add(state['content_type'])
+                    state.update(offset = 0, header = b'', content_type = '', data = None)
+                if file_size == state['offset']:
+                    continue
+                content_type, data, header, offset = self.loader._load_textfile_tail(
+                    input_file_path, state['offset'], state['header'],
+                    self.columns, self.filters)
+            except BaseException:
+                _LOGGER.exception(f'Could not refresh {input_file_path}')
+                continue
+            state.update(offset = offset, header = header)
+            if content_type != '' and len(data) > 0:
+                state['content_type'] = content_type
+                state['data'] = _concat_emr_frames(
+                    [frame for frame in (state['data'], data) if frame is not None])
+                new_frames.setdefault(content_type, []).append(data)
+                changed_types.add(content_type)
+        for content_type in changed_types - {''}:
+            self.dfs[content_type] = _concat_emr_frames([
+                state['data'] for state in self.__files.values()
+                if state['content_type'] == content_type and state['data'] is not None])
+        new_dfs = {
+            content_type: _concat_emr_frames(frames)
+            for content_type, frames in new_frames.items()}
+        _LOGGER.debug('refresh: End')
+        return new_dfs
+
+    def __header_unchanged(self, input_file_path: str, header: bytes) -> bool:
+        """Check that a file still starts with the header line seen before.
+
+        Args:
+            input_file_path (str):
+                Absolute path of the followed text file.
+            header (bytes):
+                Raw header line remembered from the previous refresh.
+
+        Returns:
+            bool:
+                True if nothing has been read yet, or the header is unchanged.
+        """
+        if header == b'':
+            return True
+        bom = b'\xef\xbb\xbf'
+        header = header[len(bom):] if header.startswith(bom) else header
+        with open(input_file_path, mode = 'rb') as file_pointer:
+            # The header is the first non-blank line, as when it was first read,
+            # and a longer first line is cut off by the limit and compares unequal
+            line = b''
+            while len(line.strip()) == 0:
+                line = file_pointer.readline(len(bom) + len(header) + 1)
+                if line == b'':
+                    return False
+        line = line[len(bom):] if line.startswith(bom) else line
+        return line == header
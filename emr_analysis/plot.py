@@ -1,16 +1,19 @@
+import os as _os
 import re as _re
+import json as _json
 import webbrowser as _wb
-from copy import deepcopy as _copy
+from html import escape as _escape
+from urllib.parse import parse_qs as _parse_qs
 from datetime import datetime as _dt
 import logging as _logging
+from collections import OrderedDict as _OrderedDict
+from concurrent.futures import ProcessPoolExecutor as _ProcessPool
 
-import dash as _dash
+import numpy as _np
 import pandas as _pd
-import plotly.express as _px
-from dash import dcc as _dcc
-from dash import html as _html
-from dash.dependencies import Output as _Output
-from dash.dependencies import Input as _Input
+
+# Dash and Plotly are imported inside the methods that use them,
+# so that importing this module stays fast
 
 # Correct logs for use with dash
 _log = _logging.getLogger('werkzeug')
@@ -42,21 +45,296 @@ def _df_check(dfs: dict):
                         '\nPlease use data.Loader() to load in custom data')
 
 
+def _display_frame(df: _pd.DataFrame) -> _pd.DataFrame:
+    """
+    Formats cells for html tables as they read in the EMR text files
+
+    Args:
+        df (pd.DataFrame):
+            Rows to display
+
+    Returns:
+        pd.DataFrame:
+            A copy with float32 values at their shortest decimal form and
+            datetimes as 'yyyy-mm-dd hh:mm:ss.fff' text
+    """
+    df = df.copy()
+    for col in df.columns:
+        if df[col].dtype == _np.float32:
+            df[col] = df[col].astype(str).astype(float)
+        elif _pd.api.types.is_datetime64_any_dtype(df[col]):
+            df[col] = df[col].dt.strftime('%Y-%m-%d %H:%M:%S.%f').str[:-3]
+    return df
+
+
+def _min_max_decimate(y: _np.ndarray, n_out: int) -> _np.ndarray:
+    """
+    Min/max decimation of a line
+
+    The points are split into equal buckets and the lowest and highest of
+    each are kept, with the first and last points, so that peaks and troughs
+    survive, unlike with every nth point.
+
+    Args:
+        y (np.ndarray):
+            y values, in x order
+        n_out (int):
+            Most points to keep, at least 4
+
+    Returns:
+        np.ndarray:
+            Sorted positions of the kept points
+    """
+    n_in = len(y)
+    if n_out >= n_in:
+        return _np.arange(n_in)
+    buckets = (n_out - 2) // 2
+    bucket = _np.arange(n_in) * buckets // n_in
+    edges = _np.searchsorted(bucket, _np.arange(buckets + 1))
+    edges[-1] = n_in
+    # Sorted by bucket then value, each bucket's ends are its min and max
+    order = _np.lexsort((y, bucket))
+    return _np.unique(_np.concatenate(
+        [[0, n_in - 1], order[edges[:-1]], order[edges[1:] - 1]]))
+
+
+def _lab_series_positions(lab_info: _pd.DataFrame, max_points: int = None,
+                          day_range: tuple = None) -> _np.ndarray:
+    """
+    Chooses the rows to plot of each (AdmissionID, LabName) series
+
+    Args:
+        lab_info (pd.DataFrame):
+            The patient's labs with 'DayInHospital', in time order
+        max_points (int, optional):
+            Series with more points are reduced to this many by
+            _min_max_decimate().
+            Defaults to None (no limit).
+        day_range (tuple, optional):
+            Only keep the (first, last) days in hospital, and the point
+            either side of them so lines run to the edge. Defaults to None.
+
+    Returns:
+        np.ndarray:
+            Sorted positions of the rows to plot
+    """
+    days = lab_info['DayInHospital'].to_numpy()
+    values = lab_info['LabValue'].to_numpy()
+    positions = []
+    for series in lab_info.groupby(['AdmissionID', 'LabName'], sort=False,
+                                   observed=True).indices.values():
+        if day_range is not None:
+            start = _np.searchsorted(days[series], day_range[0], 'left')
+            stop = _np.searchsorted(days[series], day_range[1], 'right')
+            series = series[max(start - 1, 0):stop + 1]
+        if max_points is not None and len(series) > max_points:
+            series = series[_min_max_decimate(values[series],
+                                              max(max_points, 4))]
+        positions.append(series)
+    if not positions:
+        return _np.array([], dtype=int)
+    return _np.sort(_np.concatenate(positions))
+
+
+def _lab_figures(lab_info: _pd.DataFrame, max_points: int = None,
+                 render_mode: str = 'auto', day_range: tuple = None) -> dict:
+    """
+    Plots one patient's labs, as prepared by IndSummary._lab_frame()
+
+    Args:
+        lab_info (pd.DataFrame):
+            The patient's labs with 'DayInHospital'
+        max_points (int, optional):
+            Most points to plot of each (AdmissionID, LabName) series, see
+            _lab_series_positions(). Defaults to None (all).
+        render_mode (str, optional):
+            'svg', 'webgl' or 'auto', as for plotly.express.line().
+            Defaults to 'auto'.
+        day_range (tuple, optional):
+            (first, last) days in hospital to plot. Defaults to None (all).
+
+    Returns:
+        dict:
+            Dictionary of plots with keys as the super type (eg, CBC etc.)
+    """
+    import plotly.express as _px
+
+    if max_points is not None or day_range is not None:
+        lab_info = lab_info.iloc[
+            _lab_series_positions(lab_info, max_points, day_range)]
+    lab_info = lab_info.assign(
+        LabName=lab_info['LabName'].astype(str),
+        LabUnits=lab_info['LabUnits'].astype(str),
+        LabDateTime=lab_info['LabDateTime'].dt.date)
+
+    lab_figs = {}
+    for super_set in {x.split(':')[0] for x in lab_info['LabName']}:
+        lab_fig_df = lab_info[lab_info['LabName'].str.contains(super_set)]
+        if not lab_fig_df.empty:
+            fig = _px.line(
+                lab_fig_df,
+                title=super_set + ' Data',
+                x='DayInHospital',
+                y='LabValue',
+                color='AdmissionID',
+                hover_name='LabName',
+                hover_data=['LabDateTime', 'LabUnits'],
+                facet_col='LabName',
+                facet_col_wrap=5,
+                markers=True,
+                render_mode=render_mode,
+                labels={
+                    'DayInHospital': 'Days in Hospital',
+                    'AdmissionID': 'Nth Admisssion'
+                }
+            )
+            (fig.update_yaxes(matches=None, title=None)
+             .add_annotation(x=-0.01, y=0.5,
+                             text='Lab Measured Values (hover for units)',
+                             textangle=-90, xref='paper', yref='paper',
+                             font=dict(size=10))
+             .for_each_yaxis(
+                 lambda yaxis: yaxis.update(showticklabels=True))
+             .for_each_annotation(
+                 lambda a: a.update(text=a.text.split(":")[-1].lower()))
+             .update_layout(hovermode='x unified', font=dict(size=8))
+             .update_traces(marker=dict(size=3))
+             )
+            if day_range is not None:
+                fig.update_xaxes(range=day_range)
+        else:
+            fig = None
+        lab_figs[super_set] = fig
+    return lab_figs
+
+
+def _export_summaries(summaries: list, out_dir: str, formats: tuple,
+                      plotly_js: str, max_points: int = None,
+                      render_mode: str = 'auto') -> dict:
+    """
+    Writes patient summaries to files, see IndSummary.export()
+
+    Args:
+        summaries (list):
+            (patient id, info table, lab frame) of each patient
+        out_dir (str):
+            Directory to write to
+        formats (tuple):
+            'html' and/or 'json'
+        plotly_js (str):
+            Path of plotly.js relative to the pages
+        max_points (int, optional):
+            Passed to _lab_figures(). Defaults to None.
+        render_mode (str, optional):
+            Passed to _lab_figures(). Defaults to 'auto'.
+
+    Returns:
+        dict:
+            The paths written for each patient id
+    """
+    paths = {}
+    for patient_id, info, lab_info in summaries:
+        figs = _lab_figures(lab_info, max_points, render_mode)
+        paths[patient_id] = []
+        if 'json' in formats:
+            path = _os.path.join(out_dir, f'{patient_id}.json')
+            with open(path, 'w', encoding='utf-8') as json_file:
+                _json.dump({
+                    'info': info.astype(str).to_dict(orient='records'),
+                    'plots': {super_set: _json.loads(fig.to_json())
+                              for super_set, fig in figs.items()
+                              if fig is not None},
+                }, json_file)
+            paths[patient_id].append(path)
+        if 'html' in formats:
+            html_out = [
+                f'<h1>Patient: {_escape(str(patient_id))}</h1>',
+                '<h3>Characteristics</h3>',
+                info.to_html(index=False),
+                '<h3>Lab History</h3>',
+            ]
+            include_plotlyjs = plotly_js
+            for super_set, fig in figs.items():
+                if fig is None:
+                    continue
+                fig.update_layout(title=None)
+                html_out.append(f'<h2>{_escape(super_set)}</h2>')
+                html_out.append(fig.to_html(full_html=False,
+                                            include_plotlyjs=include_plotlyjs))
+                include_plotlyjs = False
+            path = _os.path.join(out_dir, f'{patient_id}.html')
+            with open(path, 'w', encoding='utf-8') as html_file:
+                html_file.write('<html><head><meta charset="utf-8"></head>'
+                                '<body>' + ''.join(html_out) +
+                                '</body></html>')
+            paths[patient_id].append(path)
+    return paths
+
+
 class IndSummary:
     """
     Generates summary data for a requested individual
+
+    Each table is indexed by PatientID on first use: a copy sorted by
+    patient, and the start and end row of every patient in it. Fetching a
+    patient's rows is then a slice, however large the table.
+
+    Summaries returned by __call__ are kept in a least recently used cache,
+    as the info table and the figures' JSON. The cache and the indexes are
+    dropped when the data version changes, that is when a table of 'dfs' is
+    replaced or changes shape. Call 'invalidate' after editing tables in
+    place.
+
+    The dashboard from dash_app() serves any number of patients from one
+    long-lived app: a patient is chosen in its input box (or with the
+    '?patient_id=' query string), and each lab section is only plotted once
+    it is first clicked. Its callbacks go through the same cache. The app keeps no state between callbacks, so its Flask
+    server, 'dash_app().server', can run under a multi-worker WSGI server.
+
+    Long lab histories can be plotted with at most 'lab_max_points' points
+    per (AdmissionID, LabName) series, the lowest and highest of equal
+    buckets so that peaks survive, and drawn with WebGL by setting
+    'render_mode' to 'webgl'. Zooming into a dashboard figure re-plots the
+    zoomed days from the full data.
     """
 
-    def __init__(self, dfs: dict) -> None:
+    def __init__(self, dfs: dict,
+                 cache_max_entries: int = 128,
+                 cache_max_bytes: int = 64 * 1024 ** 2,
+                 lab_max_points: int = None,
+                 render_mode: str = 'auto') -> None:
         """ Initializes the class
 
         Args:
             dfs (dict):
                 Dictionary of EMR data, correctly formatter by data.Loader()
+            cache_max_entries (int, optional):
+                Maximum number of patient summaries to cache, 0 disables the
+                cache. Defaults to 128.
+            cache_max_bytes (int, optional):
+                Maximum total size of the cached summaries.
+                Defaults to 64 MiB.
+            lab_max_points (int, optional):
+                Most points to plot of each (AdmissionID, LabName) series.
+                Defaults to None (all).
+            render_mode (str, optional):
+                'svg', 'webgl' or 'auto' (WebGL above 1000 points) for the
+                lab plots. Defaults to 'auto'.
         """
 
         _df_check(dfs)
         self.dfs = dfs
+        self.cache_max_entries = cache_max_entries
+        self.cache_max_bytes = cache_max_bytes
+        self.lab_max_points = lab_max_points
+        self.render_mode = render_mode
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self._cache = _OrderedDict()
+        self._cache_bytes = 0
+        self._patient_index = {}
+        self._data_version = self._get_data_version()
+        self._app = None
 
     def __call__(self,
                  patient_id: str,
@@ -70,9 +348,9 @@ class IndSummary:
             patient_id (str):
                 The id of the patient whose summary data is requested
             browser (bool, optional):
-                If true, will open a brwser window of a Dash interactive window
-                on the requested port (default 8050).
-                Defaults to False.
+                If true, will open a brwser window of the dashboard from
+                serve() on the requested port (default 8050), showing this
+                patient. Defaults to False.
             port (int, optional):
                 The port number to start the dash server in. Defaults to 8050.
 
@@ -82,33 +360,12 @@ class IndSummary:
                 and dictionary of plotly plots of their recent lab statistics
         """
 
-        info = self.get_core_info(patient_id)
-        plots = self.get_lab_info(patient_id)
+        info, plots = self._cached_summary(patient_id)
         if browser:
-            self.browser(info, plots, port)
+            self.serve(port, patient_id)
         return {'info': info, 'plots': plots}
 
-    def _age_calc(self, start_date: _dt, end_date: _dt) -> int:
-        """ Calculate the age of a person, given two dates
-            (assumes person is not dead)
-
-        Args:
-            start_date (datetime):
-                Date person is born
-            end_date (datetime):
-                Current date
-
-        Returns:
-            int:
-                The age in years of the person
-        """
-
-        yr_diff = end_date.year - start_date.year
-        mth_diff = (end_date.month, end_date.day) \
-            < (start_date.month, start_date.day)
-        return yr_diff - mth_diff
-
-    def get_core_info(self, patient_id: str, age_at: _dt = _dt.today().date()):
+    def get_core_info(self, patient_id: str, age_at: _dt = None):
         """ Get the patients known characteristics and information
 
         Args:
@@ -116,114 +373,541 @@ class IndSummary:
                 The id of the patient whose summary data is requested
             age_at (datetime, optional):
                 Time at which to calculate people's age.
-                Defaults to current date: datetime.today().date().
+                Defaults to None, the current date: datetime.today().date().
         """
 
-        # Get and format the core individual information
-        core_info = (
-            self.dfs['patients'][self.dfs['patients']
-                                 .iloc[:, 0] == patient_id]
-        )
+        if age_at is None:
+            age_at = _dt.today().date()
+        core_info = self._core_info_table(
+            self._patient_rows('patients', patient_id), age_at)
+        core_info = core_info.melt()
+        core_info.columns = ['Patient_Info', 'Values']
+        return core_info
+
+    def _core_info_table(self, patients: _pd.DataFrame, age_at: _dt):
+        """ Format the characteristics of many patients at once, one row each
 
-        cols = core_info.columns
+        Args:
+            patients (pd.DataFrame):
+                Rows of the patients table
+            age_at (datetime):
+                Time at which to calculate people's age
+
+        Returns:
+            pd.DataFrame:
+                The patients with readable column names, and their birthday,
+                time of birth and age in place of the date of birth
+        """
+        cols = patients.columns
         col_dict = {x: _re.sub(
             r'Patient|(\w)([A-Z])', r'\1 \2', x).strip() for x in cols}
         col_dict['PatientID'] = 'ID'
-        core_info = core_info.rename(columns=col_dict)
-
-        core_info = core_info.melt()
-        core_info.columns = ['Patient_Info', 'Values']
+        core_info = patients.rename(columns=col_dict)
 
         # Format the patients birthday so it is separated between day and time
-        patient_birth = _dt.strptime(
-            core_info['Values']
-            .loc[core_info['Patient_Info'].str.lower() == 'date of birth']
-            .values[0], '%Y-%m-%d %H:%M:%S.%f')
-        patient_bday = patient_birth.date()
-        patient_btime = patient_birth.time()
-        core_info = (
-            core_info
-            .drop(index=core_info[
-                core_info['Patient_Info'].str.lower() == 'date of birth'
-            ].index))
-
-        # Get age of person at time of request
-        core_info = core_info.append(
-            _pd.DataFrame([
-                ['Birthday', patient_bday.strftime('%d/%m/%Y')],
-                ['Time of Birth', patient_btime],
-                [f'Age (as of {age_at.strftime("%d/%m/%Y")})',
-                 self._age_calc(patient_birth, age_at)]],
-                columns=core_info.columns),
-            ignore_index=True
-        )
+        patient_birth = _pd.to_datetime(patients['PatientDateOfBirth'])
+        core_info = core_info.drop(columns=col_dict['PatientDateOfBirth'])
+        core_info['Birthday'] = patient_birth.dt.strftime('%d/%m/%Y')
+        core_info['Time of Birth'] = patient_birth.dt.time
+
+        # Get age of people at time of request
+        birthday_to_come = (patient_birth.dt.month > age_at.month) | (
+            (patient_birth.dt.month == age_at.month)
+            & (patient_birth.dt.day > age_at.day))
+        core_info[f'Age (as of {age_at.strftime("%d/%m/%Y")})'] = (
+            age_at.year - patient_birth.dt.year - birthday_to_come)
         return core_info
 
-    def get_lab_info(self, patient_id: str):
+    def get_lab_info(self, patient_id: str, super_sets: list = None,
+                     day_range: tuple = None):
         """ Get's the patients lab data and plots it
 
         Args:
             patient_id (str):
                 The id of the patient whose summary data is requested
+            super_sets (list, optional):
+                Only plot these super types. Defaults to None (all).
+            day_range (tuple, optional):
+                Only plot these (first, last) days in hospital, each series
+                still limited to 'lab_max_points'. Defaults to None (all).
 
         Returns:
             dict:
                 Dictionary of plots with keys as the super type (eg, CBC etc.)
         """
 
-        lab_info = self.dfs['labs'][self.dfs['labs'].iloc[:, 0] == patient_id]
-        lab_info = lab_info.assign(LabDateTime=_pd.to_datetime(
-            lab_info['LabDateTime']
-        ).dt.date)
-        lab_info = lab_info.sort_values(by='LabDateTime')
-        start_days = (lab_info[['AdmissionID', 'LabName', 'LabDateTime']]
-                      .groupby(['AdmissionID', 'LabName'])
-                      .min()
-                      .reset_index()
-                      .rename(columns={'LabDateTime': 'StartDate'})
-                      )
-        lab_info = lab_info.merge(start_days,
-                                  how='left',
-                                  on=['AdmissionID', 'LabName'])
+        lab_info = self._patient_rows('labs', patient_id)
+        if super_sets is not None:
+            lab_info = lab_info[self._super_sets(lab_info).isin(super_sets)]
+        return _lab_figures(self._lab_frame(lab_info), self.lab_max_points,
+                            self.render_mode, day_range)
+
+    def _super_sets(self, lab_info: _pd.DataFrame) -> _pd.Series:
+        """ Get the super type (eg, CBC etc.) of each lab
+
+        Args:
+            lab_info (pd.DataFrame):
+                Rows of the labs table
+
+        Returns:
+            pd.Series:
+                The part of each LabName before the ':'
+        """
+        return lab_info['LabName'].astype(str).str.split(':').str[0]
+
+    def _lab_frame(self, labs: _pd.DataFrame) -> _pd.DataFrame:
+        """ Add each lab's day in hospital, for any number of patients at once
+
+        Args:
+            labs (pd.DataFrame):
+                Rows of the labs table
+
+        Returns:
+            pd.DataFrame:
+                The labs sorted by patient and date, with the 'LabDateTime'
+                day, the 'StartDate' of the lab in that admission and the
+                'DayInHospital'
+        """
+        lab_info = labs.assign(
+            LabDateTime=_pd.to_datetime(labs['LabDateTime']).dt.normalize())
+        lab_info = lab_info.sort_values(by=['PatientID', 'LabDateTime'],
+                                        kind='mergesort')
+        lab_info['StartDate'] = (
+            lab_info.groupby(['PatientID', 'AdmissionID', 'LabName'],
+                             observed=True)['LabDateTime']
+            .transform('min'))
         lab_info['DayInHospital'] = (lab_info['LabDateTime'] -
                                      lab_info['StartDate']).dt.days
+        return lab_info
+
+    def export(self,
+               out_dir: str,
+               patient_ids: list = None,
+               formats: tuple = ('html', 'json'),
+               workers: int = None,
+               batch_size: int = 50) -> dict:
+        """
+        Writes the summaries of many patients to static files
 
-        lab_figs = {}
-        for super_set in {x.split(':')[0] for x in lab_info['LabName']}:
-            lab_fig_df = lab_info[lab_info['LabName'].str.contains(super_set)]
-            if not lab_fig_df.empty:
-                fig = _px.line(
-                    lab_fig_df,
-                    title=super_set + ' Data',
-                    x='DayInHospital',
-                    y='LabValue',
-                    color='AdmissionID',
-                    hover_name='LabName',
-                    hover_data=['LabDateTime', 'LabUnits'],
-                    facet_col='LabName',
-                    facet_col_wrap=5,
-                    markers=True,
-                    labels={
-                        'DayInHospital': 'Days in Hospital',
-                        'AdmissionID': 'Nth Admisssion'
-                    }
-                )
-                (fig.update_yaxes(matches=None, title=None)
-                 .add_annotation(x=-0.01, y=0.5,
-                                 text='Lab Measured Values (hover for units)',
-                                 textangle=-90, xref='paper', yref='paper',
-                                 font=dict(size=10))
-                 .for_each_yaxis(
-                     lambda yaxis: yaxis.update(showticklabels=True))
-                 .for_each_annotation(
-                     lambda a: a.update(text=a.text.split(":")[-1].lower()))
-                 .update_layout(hovermode='x unified', font=dict(size=8))
-                 .update_traces(marker=dict(size=3))
-                 )
-            else:
-                fig = None
-            lab_figs[super_set] = fig
-        return lab_figs
+        Ages and days in hospital are computed for all the patients in one
+        pass, then the figures are built and written by a process pool.
+        HTML pages load a single plotly.min.js written next to them.
+
+        Args:
+            out_dir (str):
+                Directory to write to, created if missing
+            patient_ids (list, optional):
+                The ids of the patients to export.
+                Defaults to None (every patient).
+            formats (tuple, optional):
+                'html' for a page per patient like browser(), and 'json' for
+                the info table and figures as JSON.
+                Defaults to ('html', 'json').
+            workers (int, optional):
+                Number of worker processes. Defaults to None (one per CPU).
+            batch_size (int, optional):
+                Number of patients sent to a worker at a time.
+                Defaults to 50.
+
+        Returns:
+            dict:
+                The paths written for each patient id
+        """
+        _os.makedirs(out_dir, exist_ok=True)
+        plotly_js = None
+        if 'html' in formats:
+            from plotly.offline import get_plotlyjs as _get_plotlyjs
+
+            plotly_js = 'plotly.min.js'
+            with open(_os.path.join(out_dir, plotly_js), 'w',
+                      encoding='utf-8') as js_file:
+                js_file.write(_get_plotlyjs())
+
+        patients = self.dfs['patients']
+        labs = self.dfs['labs']
+        if patient_ids is not None:
+            patients = patients[patients['PatientID'].isin(patient_ids)]
+            labs = labs[labs['PatientID'].isin(patient_ids)]
+        infos = self._core_info_table(patients, _dt.today().date())
+        lab_frame = self._lab_frame(labs)
+        lab_infos = dict(tuple(lab_frame.groupby('PatientID', sort=False)))
+
+        summaries = [(patient_id, infos.iloc[[i]].melt().set_axis(
+                          ['Patient_Info', 'Values'], axis=1),
+                      lab_infos.get(patient_id, lab_frame.iloc[:0]))
+                     for i, patient_id in enumerate(patients['PatientID'])]
+        batches = [summaries[i:i + batch_size]
+                   for i in range(0, len(summaries), batch_size)]
+
+        paths = {}
+        if workers == 1 or len(batches) < 2:
+            for batch in batches:
+                paths.update(_export_summaries(batch, out_dir, formats,
+                                               plotly_js, self.lab_max_points,
+                                               self.render_mode))
+        else:
+            with _ProcessPool(max_workers=workers) as pool:
+                for batch_paths in pool.map(
+                        _export_summaries, batches,
+                        [out_dir] * len(batches), [formats] * len(batches),
+                        [plotly_js] * len(batches),
+                        [self.lab_max_points] * len(batches),
+                        [self.render_mode] * len(batches)):
+                    paths.update(batch_paths)
+        return paths
+
+    def dash_app(self):
+        """ Builds, once, the multi-patient dashboard
+
+        Returns:
+            dash.Dash:
+                The app, whose 'server' attribute is its Flask WSGI app
+        """
+        if self._app is not None:
+            return self._app
+
+        import dash as _dash
+        from dash import dcc as _dcc
+        from dash import html as _html
+        from dash.dependencies import Output as _Output
+        from dash.dependencies import Input as _Input
+        from dash.dependencies import State as _State
+        from dash.dependencies import MATCH as _MATCH
+
+        app = _dash.Dash('Individual Summary',
+                         suppress_callback_exceptions=True)
+        app.layout = _html.Div(children=[
+            _dcc.Location(id='url'),
+            _html.Label('Patient ID'),
+            _dcc.Input(id='patient_id', type='text', debounce=True,
+                       style={'width': '30em'}),
+            _html.Div(id='patient')
+        ])
+
+        callback_components = app.callback(_Output('patient_id', 'value'),
+                                           _Input('url', 'search'))
+        callback_components(self.url_patient)
+        callback_components = app.callback(_Output('patient', 'children'),
+                                           _Input('patient_id', 'value'))
+        callback_components(self.patient_out)
+        callback_components = app.callback(
+            _Output({'type': 'lab_graph', 'index': _MATCH}, 'children'),
+            _Input({'type': 'lab_section', 'index': _MATCH}, 'n_clicks'),
+            _State('patient_id', 'value'),
+            _State({'type': 'lab_section', 'index': _MATCH}, 'id'),
+            _State({'type': 'lab_graph', 'index': _MATCH}, 'children'))
+        callback_components(self.lab_section_out)
+        callback_components = app.callback(
+            _Output({'type': 'lab_figure', 'index': _MATCH}, 'figure'),
+            _Input({'type': 'lab_figure', 'index': _MATCH}, 'relayoutData'),
+            _State('patient_id', 'value'),
+            _State({'type': 'lab_figure', 'index': _MATCH}, 'id'))
+        callback_components(self.lab_zoom_out)
+
+        self._app = app
+        return app
+
+    def serve(self, port: int = 8050, patient_id: str = None):
+        """ Opens the dashboard from dash_app() in a new browser window and
+        runs its development server
+
+        Args:
+            port (int, optional):
+                The port number to start the dash server in. Defaults to 8050.
+            patient_id (str, optional):
+                The patient to show first. Defaults to None.
+
+        Returns: None
+        """
+        app = self.dash_app()
+
+        applog = _logging.getLogger('Individual Summary')
+        applog.handlers = []
+        query = '' if patient_id is None else f'?patient_id={patient_id}'
+        _wb.open_new('http://127.0.0.1:' + str(port) + '/' + query)
+        app.run_server(port=port)
+        return None
+
+    def url_patient(self, search: str):
+        """ Uses the dash callback to read the patient id from the page url
+
+        Args:
+            search (str):
+                The query string of the url
+
+        Returns:
+            str:
+                The 'patient_id' query parameter, or None
+        """
+        from dash import no_update as _no_update
+
+        patient_id = _parse_qs((search or '').lstrip('?')).get('patient_id')
+        return patient_id[0] if patient_id else _no_update
+
+    def patient_out(self, patient_id: str):
+        """ Uses the dash callback to show a patient's information, and a
+        collapsed section for each of their lab super types
+
+        Args:
+            patient_id (str):
+                The id of the patient whose summary data is requested
+
+        Returns:
+            list:
+                Dash components of the patient summary
+        """
+        from dash import html as _html
+
+        if not patient_id:
+            return []
+        self._check_data_version()
+        if self._patient_rows('patients', patient_id).empty:
+            return [_html.H3(f'Patient {patient_id} not found')]
+
+        info, _ = self._cached_summary(patient_id, super_sets=[])
+        super_sets = sorted(self._super_sets(
+            self._patient_rows('labs', patient_id)).unique())
+        return [
+            _html.H1(children='Patient: ' + patient_id),
+            _html.H3('Characteristics'),
+            self._info_table(info),
+            _html.H3('Lab History'),
+        ] + [
+            _html.Details(id={'type': 'lab_section', 'index': super_set},
+                          children=[
+                              _html.Summary(super_set),
+                              _html.Div(id={'type': 'lab_graph',
+                                            'index': super_set})
+                          ])
+            for super_set in super_sets
+        ]
+
+    def lab_section_out(self, n_clicks: int, patient_id: str,
+                        section_id: dict, children):
+        """ Uses the dash callback to plot a lab super type when its section
+        is first clicked
+
+        Args:
+            n_clicks (int):
+                Number of clicks on the section, None before the first
+            patient_id (str):
+                The id of the patient whose summary data is requested
+            section_id (dict):
+                Id of the section, with the super type as 'index'
+            children:
+                The current contents of the section
+
+        Returns:
+            dcc.Graph:
+                The super type's figure
+        """
+        from dash import dcc as _dcc
+        from dash import no_update as _no_update
+
+        # Details only reports clicks, not 'open', and clicks on the loaded
+        # figure bubble up to it
+        if not n_clicks or children is not None:
+            return _no_update
+        super_set = section_id['index']
+        _, plots = self._cached_summary(patient_id, super_sets=[super_set])
+        fig = plots.get(super_set)
+        if fig is None:
+            return _no_update
+        fig.update_layout(title=None, uirevision=super_set)
+        return _dcc.Graph(id={'type': 'lab_figure', 'index': super_set},
+                          figure=fig)
+
+    def lab_zoom_out(self, relayout: dict, patient_id: str, figure_id: dict):
+        """ Uses the dash callback to re-plot the zoomed days of a lab super
+        type, when its series are downsampled
+
+        Args:
+            relayout (dict):
+                The figure's relayoutData
+            patient_id (str):
+                The id of the patient whose summary data is requested
+            figure_id (dict):
+                Id of the figure, with the super type as 'index'
+
+        Returns:
+            plotly.graph_objects.Figure:
+                The super type's figure
+        """
+        from dash import no_update as _no_update
+
+        if self.lab_max_points is None or not relayout:
+            return _no_update
+        # The facets share their x axis, any of them gives the range
+        day_range = None
+        for key, value in relayout.items():
+            if _re.fullmatch(r'xaxis\d*\.range', key):
+                day_range = tuple(value)
+            elif _re.fullmatch(r'xaxis\d*\.range\[0\]', key):
+                day_range = (value, relayout[key[:-3] + '[1]'])
+        zoomed_out = any(_re.fullmatch(r'xaxis\d*\.autorange', key)
+                         for key in relayout)
+        if day_range is None and not zoomed_out:
+            return _no_update
+        super_set = figure_id['index']
+        if day_range is None:
+            _, plots = self._cached_summary(patient_id, super_sets=[super_set])
+        else:
+            self._check_data_version()
+            plots = self.get_lab_info(patient_id, [super_set], day_range)
+        fig = plots.get(super_set)
+        if fig is None:
+            return _no_update
+        return fig.update_layout(title=None, uirevision=super_set)
+
+    def _info_table(self, info: _pd.DataFrame):
+        """ Convert the table of core information to html
+
+        Args:
+            info (pd.DataFrame):
+                Table of core information given by get_core_info()
+
+        Returns:
+            html.Table:
+                The table in a html form
+        """
+        from dash import html as _html
+
+        info = _display_frame(info)
+        return _html.Table([
+            _html.Thead(_html.Tr([
+                    _html.Th(col)
+                    for col in info.columns])),
+            _html.Tbody([_html.Tr([
+                _html.Td(info.iloc[i][col])
+                for col in info.columns])
+                for i in range(len(info))])
+        ])
+
+    def cache_info(self) -> dict:
+        """ Get the state of the summary cache
+
+        Returns:
+            dict:
+                'hits', 'misses', 'entries' and 'bytes' of the cache
+        """
+        return {'hits': self.cache_hits, 'misses': self.cache_misses,
+                'entries': len(self._cache), 'bytes': self._cache_bytes}
+
+    def invalidate(self):
+        """ Drop the cached summaries and patient indexes, for use after the
+        tables in 'dfs' are edited in place
+        """
+        self._cache.clear()
+        self._cache_bytes = 0
+        self._patient_index = {}
+        self._data_version = self._get_data_version()
+
+    def _check_data_version(self):
+        """ Drop the cached summaries and patient indexes if the data version
+        has changed
+        """
+        if self._get_data_version() != self._data_version:
+            self.invalidate()
+
+    def _get_data_version(self) -> tuple:
+        """ Get a token that changes when a table is replaced or resized
+
+        Returns:
+            tuple:
+                The identity and shape of each table
+        """
+        return tuple((key, id(df), df.shape) for key, df in self.dfs.items())
+
+    def _cached_summary(self, patient_id: str, super_sets: list = None):
+        """ Get a patient's info table and lab figures through the cache
+
+        A patient's cache entry holds the figures of the super types asked
+        for so far, so the dashboard can fill it one section at a time.
+        Entries are keyed on the date, for the age, and on 'lab_max_points'
+        and 'render_mode', which change the figures.
+
+        Args:
+            patient_id (str):
+                The id of the patient whose summary data is requested
+            super_sets (list, optional):
+                Only get these super types' figures. Defaults to None (all).
+
+        Returns:
+            tuple:
+                The info table from get_core_info() and the figures from
+                get_lab_info(), both new objects the caller may modify
+        """
+        import plotly.io as _pio
+
+        self._check_data_version()
+
+        if super_sets is None:
+            super_sets = self._super_sets(
+                self._patient_rows('labs', patient_id)).unique()
+        today = _dt.today().date()
+        key = (patient_id, today, self.lab_max_points, self.render_mode)
+        if key in self._cache:
+            info, fig_json, size = self._cache.pop(key)
+            self._cache_bytes -= size
+        else:
+            info = self.get_core_info(patient_id, today)
+            fig_json, size = {}, None
+        missing = [super_set for super_set in super_sets
+                   if super_set not in fig_json]
+        if size is not None and not missing:
+            self.cache_hits += 1
+        else:
+            self.cache_misses += 1
+
+        plots = self.get_lab_info(patient_id, missing) if missing else {}
+        fig_json.update({super_set: None if fig is None else fig.to_json()
+                         for super_set, fig in plots.items()})
+        plots.update({
+            super_set: None if fig_json[super_set] is None
+            else _pio.from_json(fig_json[super_set])
+            for super_set in super_sets
+            if super_set in fig_json and super_set not in plots})
+
+        if self.cache_max_entries > 0:
+            size = int(info.memory_usage(deep=True).sum()) + sum(
+                len(fig) for fig in fig_json.values() if fig is not None)
+            if size <= self.cache_max_bytes:
+                self._cache[key] = (info, fig_json, size)
+                self._cache_bytes += size
+                while len(self._cache) > self.cache_max_entries or \
+                        self._cache_bytes > self.cache_max_bytes:
+                    self._cache_bytes -= self._cache.popitem(last=False)[1][2]
+        return info.copy(), plots
+
+    def _patient_rows(self, key: str, patient_id: str) -> _pd.DataFrame:
+        """ Get a patient's rows of a table, building its patient index once
+
+        Args:
+            key (str):
+                The table to get the rows of
+            patient_id (str):
+                The id of the patient whose rows are requested
+
+        Returns:
+            pd.DataFrame:
+                A slice of the table sorted by patient, empty if the patient
+                has no rows
+        """
+        if key not in self._patient_index:
+            df = self.dfs[key]
+            codes, patient_ids = _pd.factorize(df['PatientID'])
+            order = _np.argsort(codes, kind='stable')
+            counts = _np.bincount(codes[codes >= 0],
+                                  minlength=len(patient_ids))
+            ends = (codes < 0).sum() + _np.cumsum(counts)
+            starts = ends - counts
+            self._patient_index[key] = (
+                df.take(order),
+                dict(zip(patient_ids, zip(starts.tolist(), ends.tolist()))))
+
+        sorted_df, offsets = self._patient_index[key]
+        start, end = offsets.get(patient_id, (0, 0))
+        return sorted_df.iloc[start:end]
 
     def browser(self, info: _pd.DataFrame, figs: dict, port: int):
         """ Opens a new browser page housing the individuals information
@@ -238,20 +922,16 @@ class IndSummary:
 
         Returns: None
         """
+        import dash as _dash
+        from dash import dcc as _dcc
+        from dash import html as _html
+
         applog = _logging.getLogger('Individual Summary')
         app = _dash.Dash('Individual Summary')
         html_out = [
             _html.H1(children='Patient: ' + info['Values'].iloc[0]),
             _html.H3('Characteristics'),
-            _html.Table([
-                _html.Thead(_html.Tr([
-                        _html.Th(col)
-                        for col in info.columns])),
-                _html.Tbody([_html.Tr([
-                    _html.Td(info.iloc[i][col])
-                    for col in info.columns])
-                    for i in range(len(info))])
-            ]),
+            self._info_table(info),
             _html.H3('Lab History')
         ]
         for plot in figs.keys():
@@ -272,8 +952,13 @@ class QuickSearch:
     Opens a webbrowser to filter the dataframes, can be used to search for
     specific patients more easily.
     Users may want to copy the patients ID for use in the IndSummary()
+
+    Tables in 'SORTED_COLUMNS' are kept sorted by that column, so that date
+    filters on it are binary searched slices rather than boolean masks.
     """
 
+    SORTED_COLUMNS = {'patients': 'PatientDateOfBirth'}
+
     def __init__(self, dfs: dict):
         """ Initializes the class
 
@@ -282,10 +967,14 @@ class QuickSearch:
                 The id of the patient whose summary data is requested
         """
 
-        self.dfs = dfs
-        date = _pd.to_datetime(dfs['patients']['PatientDateOfBirth']).dt.date
-        self._min_year = date.min().year
-        self._max_year = date.max().year
+        self.dfs = dict(dfs)
+        for key, column in self.SORTED_COLUMNS.items():
+            df = self.dfs[key]
+            self.dfs[key] = (df.assign(**{column: _pd.to_datetime(df[column])})
+                             .sort_values(column, kind='mergesort'))
+        date = self.dfs['patients']['PatientDateOfBirth'].dropna()
+        self._min_year = date.iloc[0].year
+        self._max_year = date.iloc[-1].year
         self._min_admit = self.dfs['admissions']['AdmissionID'].min()
         self._max_admit = self.dfs['admissions']['AdmissionID'].max()
 
@@ -299,6 +988,12 @@ class QuickSearch:
                 Port to open the interactive server on.
                 Defaults to 8050.
         """
+        import dash as _dash
+        from dash import dcc as _dcc
+        from dash import html as _html
+        from dash.dependencies import Output as _Output
+        from dash.dependencies import Input as _Input
+
         applog = _logging.getLogger('Quick Search')
         app = _dash.Dash('Quick Search')
         info = self.dfs['patients']
@@ -398,7 +1093,9 @@ class QuickSearch:
             list:
                 List of html tables to print as output for dash server
         """
-        filtered_dfs = _copy(self.dfs)
+        from dash import html as _html
+
+        filtered_dfs = dict(self.dfs)
 
         self.filter_str(filtered_dfs, 'patients', 'PatientGender',
                         sex)
@@ -475,12 +1172,14 @@ class QuickSearch:
             [html.Table]:
                 The pandas dataframe in a html form
         """
+        from dash import html as _html
 
+        df = _display_frame(df.iloc[:max_rows])
         return _html.Table([
             _html.Thead(_html.Tr([_html.Th(col) for col in df.columns])),
             _html.Tbody([_html.Tr(
                 [_html.Td(df.iloc[i][col]) for col in df.columns]
-            ) for i in range(min(len(df), max_rows))
+            ) for i in range(len(df))
             ])
         ])
 
@@ -503,8 +1202,8 @@ class QuickSearch:
                 Comparison request, can be 'min', 'max' or 'exact'.
                 Defaults to 'min'.
             date (bool, optional):
-                Set True if a datetime column is being put it.
-                Defaults to False.
+                Set True if a datetime column is being put it, in which case
+                'value' is a year. Defaults to False.
 
         Returns:
             None
@@ -512,6 +1211,10 @@ class QuickSearch:
         """
         
         if value is not None:
+            if date and self.SORTED_COLUMNS.get(key) == column:
+                dfs[key] = self._year_slice(dfs[key][column], dfs[key],
+                                            value, minmax)
+                return
             if date:
                 filter_col = _pd.DatetimeIndex(dfs[key][column]).year
             else:
@@ -523,6 +1226,36 @@ class QuickSearch:
             elif minmax == 'exact':
                 dfs[key] = dfs[key][filter_col == value]
 
+    def _year_slice(self, column: _pd.Series, df: _pd.DataFrame,
+                    year: int, minmax: str):
+        """
+        Slices a dataframe sorted by a datetime column to the rows born
+        before, after or in the given year
+
+        Args:
+            column (pd.Series):
+                The sorted datetime column, missing values last
+            df (pd.DataFrame):
+                The dataframe to slice
+            year (int):
+                Year to be compared
+            minmax (str):
+                Comparison request, can be 'min', 'max' or 'exact'
+
+        Returns:
+            pd.DataFrame:
+                A slice of 'df'
+        """
+        times = column.to_numpy()
+        bounds = _np.array([f'{year}', f'{year + 1}', 'NaT'],
+                           dtype='datetime64[Y]').astype(times.dtype)
+        first, after, missing = _np.searchsorted(times, bounds)
+        if minmax == 'min':
+            return df.iloc[first:missing]
+        if minmax == 'max':
+            return df.iloc[:after]
+        return df.iloc[first:after]
+
     def filter_str(self, dfs: _pd.DataFrame, key: str, column: str,
                    text, is_list: bool=False):
         """
@@ -1,24 +1,101 @@
+import os as _os
+import json as _json
+import hashlib as _hashlib
 import datetime as _dt
-import matplotlib.pyplot as _plt
+from itertools import repeat as _repeat
+from concurrent.futures import ProcessPoolExecutor as _ProcessPool
 import numpy as _np
 import pandas as _pd
 
+# Summary being rendered by a render_all worker process
+_RENDER_SUMMARY = None
+
+
+def _init_render_worker(summary):
+    """Sets up a render_all worker process with the Agg backend.
+
+    Args:
+        summary (SummaryInformation):
+            The summary whose figures the worker renders.
+    """
+    global _RENDER_SUMMARY
+    import matplotlib
+    matplotlib.use('Agg')
+    _RENDER_SUMMARY = summary
+
+
+def _render_in_worker(name, out_dir, formats):
+    """Renders a figure of the worker's summary, see render_all."""
+    return _RENDER_SUMMARY._render_figure(name, out_dir, formats)
+
+
+def _summarise_lab_shard(shard_path, compression, chunksize):
+    """Streams the labs of a shard into a state, see LabSummaryState.from_shards."""
+    from .data import Loader
+
+    load_type = 'zip' if shard_path.lower().endswith('.zip') else 'text'
+    state = LabSummaryState(compression)
+    for content_type, chunk in Loader().iter_chunks(
+            load_type, shard_path, chunksize,
+            columns={'labs': ['LabName', 'LabUnits', 'LabValue']}):
+        if content_type == 'labs':
+            state.update(chunk)
+    return state
+
+
 class SummaryInformation():
     """Contains functions to display relevent general summary statistics.
 
+    Date-range queries on admissions and labs are answered from aggregate
+    cubes of per-bucket statistics, built once on first use. Queries that need
+    the rows themselves binary search a sorted time index of the table.
+
+    The tables in 'dfs' are never modified. Parsed dates and derived columns
+    are computed on first use and kept on the object.
     """
 
-    def __init__(self, dfs):
+    # Bucket size of the aggregate cubes, as a NumPy datetime64 unit
+    CUBE_FREQ = 'D'
 
-        self.dfs = dfs
+    # Figures rendered by render_all, with the method drawing them and the
+    # table they are drawn from. Each lab type adds a 'labs_<type>' figure.
+    FIGURES = {
+        'admissions': ('admissions_plot', 'admissions'),
+        'admission_time': ('admission_time_plot', 'admissions'),
+        'census': ('census_plot', 'admissions'),
+        'personal': ('personal_plot', 'patients'),
+    }
+
+    # File in a render_all output directory recording figure fingerprints
+    RENDER_MANIFEST = '.render_fingerprints.json'
+
+    # Columns parsed as dates when first used
+    DATE_COLUMNS = {
+        'admissions': ['AdmissionStartDate', 'AdmissionEndDate'],
+        'labs': ['LabDateTime'],
+    }
 
-        self.dfs['admissions']['AdmissionStartDate'] = _pd.to_datetime(
-            self.dfs['admissions']['AdmissionStartDate'])
-        self.dfs['admissions']['AdmissionEndDate'] = _pd.to_datetime(
-            self.dfs['admissions']['AdmissionEndDate'])
+    # Quantile of the length of stay above which admissions are checked one
+    # by one, rather than through the start window, by in_hospital
+    CENSUS_LONG_STAY_QUANTILE = .99
 
-        self.dfs['labs']['LabDateTime'] = _pd.to_datetime(
-            self.dfs['labs']['LabDateTime'])
+    # Timestamp column each table is indexed on for date-window queries
+    TIME_COLUMNS = {
+        'admissions': 'AdmissionStartDate',
+        'labs': 'LabDateTime',
+    }
+
+    def __init__(self, dfs):
+
+        self.dfs = dfs
+        self._admissions_cube = None
+        self._census_events = None
+        self._census_index = None
+        self._readmissions = None
+        self._labs_cube = None
+        self._lab_hists = {}
+        self._time_indexes = {}
+        self._columns = {}
 
     def admissions_plot(self, from_date=None, to_date=None):
         """Creates a figure containing time series information on admissions.
@@ -28,37 +105,43 @@ class SummaryInformation():
                 The date for the plot to begin from (yyyy-mm-dd). Defaults to 
                 the minimum date.
             to_date (str, optional):
-                The date for the plot to end (yyyy-mm-dd). Defaults to the
-                maximum date.
+                The date for the plot to end, exclusive (yyyy-mm-dd). Defaults
+                to the maximum date.
 
         Returns:
             fig : matplotlib.figure.Figure
             ax : matplotlib.axes.Axes
         """
+        import matplotlib.pyplot as _plt
+
+        cube = self._get_admissions_cube()
+        start, end = self._sorted_window(cube['buckets'], from_date, to_date)
+
+        # The first and last buckets are the days of the first and last starts
+        first = _pd.Timestamp(cube['buckets'][0])
+        last = _pd.Timestamp(cube['buckets'][-1])
 
         if from_date is None:
-            from_date = self.dfs['admissions']['AdmissionStartDate'].min()
+            from_date = first
         else:
             from_date = _dt.datetime.strptime(from_date, '%Y-%m-%d')
 
         if to_date is None:
-            to_date = self.dfs['admissions']['AdmissionStartDate'].max()
+            to_date = last
         else:
             to_date = _dt.datetime.strptime(to_date, '%Y-%m-%d')
 
-        max_diff = self.dfs['admissions']['AdmissionStartDate'].max().year - \
-            self.dfs['admissions']['AdmissionStartDate'].min().year
+        max_diff = last.year - first.year
         diff = ((to_date.year - from_date.year) / max_diff) * 10 + 5
 
         fig = _plt.figure(figsize=(diff, 3))
         ax = fig.add_subplot()
 
-        (self.dfs['admissions'][
-            (self.dfs['admissions']['AdmissionStartDate'] > from_date)
-            & (self.dfs['admissions']['AdmissionStartDate'] < to_date)
-        ][['AdmissionStartDate']]
-            .groupby([self.dfs['admissions'].AdmissionStartDate.dt.year])
-            .count()
+        years = cube['buckets'][start:end].astype('datetime64[Y]').astype(int)
+        (_pd.DataFrame({'AdmissionStartDate': cube['count'][start:end]},
+                       index=_pd.Index(years + 1970, name='AdmissionStartDate'))
+            .groupby(level=0)
+            .sum()
             .plot(kind="bar", ax=ax))
 
         ax.set_title("Number of admissions per year")
@@ -74,110 +157,476 @@ class SummaryInformation():
             fig : matplotlib.figure.Figure
             ax : matplotlib.axes.Axes
         """
+        import matplotlib.pyplot as _plt
+
         fig = _plt.figure(figsize=(12, 3))
         ax = fig.add_subplot()
 
-        self.dfs['admissions']['AdmissionDiff'] = \
-            self.dfs['admissions']['AdmissionEndDate'] - \
-            self.dfs['admissions']['AdmissionStartDate']
-        self.dfs['admissions']['AdmissionDiff'] = \
-            self.dfs['admissions']['AdmissionDiff'] / \
-            _np.timedelta64(1, 'D')
-        self.dfs['admissions']['AdmissionDiff'].plot(kind='hist', ax=ax)
+        self._get_column('admissions', 'LengthOfStay').plot(kind='hist', ax=ax)
 
         ax.set_title("Time spent in admission")
         ax.set_xlabel("Time (days)")
 
         return fig, ax
 
-    def lab_summary(self, from_date=None, to_date=None):
+    def census(self, from_date=None, to_date=None):
+        """Creates the daily hospital census from the admission intervals.
+
+        A patient is counted on every day from the day of admission to the day
+        of discharge, inclusive, and admissions without an end date are counted
+        as still in hospital. Admission starts and discharges are swept once,
+        in sorted order, so the cost does not depend on the lengths of stay.
+
+        Args:
+            from_date (str, optional):
+                The first day of the census (yyyy-mm-dd). Defaults to None
+                (the first admission day).
+            to_date (str, optional):
+                The day the census ends before (yyyy-mm-dd). Defaults to None
+                (after the last admission or discharge day).
+
+        Returns:
+            pandas.Series:
+                Number of patients in hospital, indexed by day.
+        """
+        days, occupancy, first, last = self._get_census_events()
+
+        first = first if from_date is None else self._cube_bucket(from_date)
+        last = last + 1 if to_date is None else self._cube_bucket(to_date)
+        index = _np.arange(first, max(first, last),
+                           dtype=f'datetime64[{self.CUBE_FREQ}]')
+
+        position = _np.searchsorted(days, index, side='right') - 1
+        counts = _np.where(position >= 0,
+                           occupancy[_np.maximum(position, 0)], 0)
+
+        return _pd.Series(counts, index=_pd.DatetimeIndex(index, name='Date'),
+                          name='Occupancy')
+
+    def in_hospital(self, date):
+        """Finds the admissions of patients in hospital on a day.
+
+        Agrees with 'census': the admissions that started on or before the day
+        and were discharged on or after it, or not at all.
+
+        Args:
+            date (str):
+                The day to query (yyyy-mm-dd).
+
+        Returns:
+            pandas.DataFrame:
+                The matching rows of the admissions table.
+        """
+        index = self._get_census_index()
+        day = self._cube_bucket(date)
+        start_of_day = day.astype('datetime64[ns]')
+        end_of_day = (day + 1).astype('datetime64[ns]')
+
+        start, end = _np.searchsorted(
+            index['starts'], [start_of_day - index['window'], end_of_day])
+        short = start + _np.flatnonzero(
+            index['ends'][start:end] >= start_of_day)
+        long = (index['long_starts'] < end_of_day) & \
+            (index['long_ends'] >= start_of_day)
+
+        rows = _np.sort(_np.concatenate([index['rows'][short],
+                                         index['long_rows'][long]]))
+        return self.dfs['admissions'].take(rows)
+
+    def census_plot(self, from_date=None, to_date=None):
+        """Creates a figure containing the daily hospital census.
+
+        Args:
+            from_date (str, optional):
+                The date for the plot to begin from (yyyy-mm-dd). Defaults to
+                the first admission day.
+            to_date (str, optional):
+                The date for the plot to end, exclusive (yyyy-mm-dd). Defaults
+                to the last admission or discharge day.
+
+        Returns:
+            fig : matplotlib.figure.Figure
+            ax : matplotlib.axes.Axes
+        """
+        import matplotlib.pyplot as _plt
+
+        fig = _plt.figure(figsize=(12, 3))
+        ax = fig.add_subplot()
+
+        self.census(from_date, to_date).plot(ax=ax)
+
+        ax.set_title("Patients in hospital per day")
+        ax.set_xlabel("Date")
+        ax.set_ylabel("Patients")
+
+        return fig, ax
+
+    def patient_readmissions(self, windows=(30, 90)):
+        """Creates a table of readmission counts and rates for each patient.
+
+        Every discharged admission is an index admission, and is counted as
+        readmitted within a window if the patient's next admission starts at
+        most that many days after the discharge (or before it).
+
+        Args:
+            windows (tuple, optional):
+                Readmission windows in days. Defaults to (30, 90).
+
+        Returns:
+            pandas.DataFrame:
+                Indexed by PatientID, with the number of index 'Admissions'
+                and, for each window, 'Readmissions<days>' and
+                'ReadmissionRate<days>'.
+        """
+        readmissions = self._get_readmissions()
+        return self._readmission_rates(
+            readmissions, readmissions['PatientID'], windows)
+
+    def readmission_rates(self, windows=(30, 90), by=None):
+        """Creates a table of readmission rates, overall or by cohort.
+
+        Admissions are defined as in 'patient_readmissions'. Cohort columns
+        are taken from the patients table (on PatientID) and the diagnosis
+        table (on PatientID and AdmissionID) in a single join.
+
+        Args:
+            windows (tuple, optional):
+                Readmission windows in days. Defaults to (30, 90).
+            by (list, optional):
+                Columns of the patients or diagnosis tables to break the rates
+                down by, e.g. ['PatientGender', 'PrimaryDiagnosisCode'].
+                Defaults to None (a single 'All' row).
+
+        Returns:
+            pandas.DataFrame:
+                With the number of index 'Admissions' and, for each window,
+                'Readmissions<days>' and 'ReadmissionRate<days>'.
+        """
+        readmissions = self._get_readmissions()
+        if by is None:
+            return self._readmission_rates(
+                readmissions, _np.zeros(len(readmissions), dtype=int),
+                windows).set_axis(['All'])
+
+        by = [by] if isinstance(by, str) else list(by)
+        patient_columns = [column for column in by
+                           if column in self.dfs['patients'].columns]
+        diagnosis_columns = [column for column in by
+                             if column not in patient_columns]
+        if patient_columns:
+            readmissions = readmissions.merge(
+                self.dfs['patients'][['PatientID'] + patient_columns],
+                on='PatientID', how='left')
+        if diagnosis_columns:
+            readmissions = readmissions.merge(
+                self.dfs['diagnosis'][['PatientID', 'AdmissionID'] +
+                                      diagnosis_columns],
+                on=['PatientID', 'AdmissionID'], how='left')
+        return self._readmission_rates(
+            readmissions, [readmissions[column] for column in by], windows)
+
+    def lab_summary(self, from_date=None, to_date=None, quantiles=True):
         """Creates a table contain summary statistics of lab values for each lab type.
 
+        Count, mean, standard deviation, minimum and maximum are read from the
+        labs aggregate cube. Quartiles need the individual values, so they are
+        computed with a scan of the labs in the window, which can be skipped
+        with 'quantiles=False'.
+
         Args:
             from_date (str, optional):
                 The date for the plots to begin from (yyyy-mm-dd). Defaults to
                 None (the minimum date).
             to_date (str, optional):
-                The date for the plots to end (yyyy-mm-dd). Defaults to None
-                (the maximum date).
+                The date for the plots to end, exclusive (yyyy-mm-dd). Defaults
+                to None (the maximum date).
+            quantiles (bool, optional):
+                If True, also include the 25%, 50% and 75% quantiles.
+                Defaults to True.
 
         Returns:
             pandas.DataFrame
         """
-        if from_date is None:
-            from_date = self.dfs['labs']['LabDateTime'].min()
-        else:
-            from_date = _dt.datetime.strptime(from_date, '%Y-%m-%d')
+        cube = self._get_labs_cube()
+        start, end = self._sorted_window(cube['buckets'], from_date, to_date)
 
-        if to_date is None:
-            to_date = self.dfs['labs']['LabDateTime'].max()
-        else:
-            to_date = _dt.datetime.strptime(to_date, '%Y-%m-%d')
+        count = cube['cumcount'][:, end] - cube['cumcount'][:, start]
+        total = cube['cumsum'][:, end] - cube['cumsum'][:, start]
+        total_sq = cube['cumsumsq'][:, end] - cube['cumsumsq'][:, start]
+        observed = count > 0
+
+        with _np.errstate(divide='ignore', invalid='ignore'):
+            mean = cube['shift'] + total / count
+            var = _np.clip(total_sq - total * total / count, 0, None) / \
+                (count - 1)
+        var[count < 2] = _np.nan
+
+        details = _pd.DataFrame({
+            'count': count.astype(float),
+            'mean': mean,
+            'std': _np.sqrt(var),
+            'min': cube['min'][:, start:end].min(axis=1, initial=_np.inf),
+            'max': cube['max'][:, start:end].max(axis=1, initial=-_np.inf),
+        }, index=cube['groups'])[observed]
+
+        if quantiles:
+            quartiles = (self._time_window('labs', from_date, to_date)
+                         .groupby(['LabName', 'LabUnits'], observed=True)
+                         ['LabValue']
+                         .quantile([.25, .5, .75])
+                         .unstack()
+                         .reindex(columns=[.25, .5, .75]))
+            quartiles.columns = ['25%', '50%', '75%']
+            details = details.join(quartiles)[
+                ['count', 'mean', 'std', 'min', '25%', '50%', '75%', 'max']]
 
-        details = (self.dfs['labs'][
-                    (self.dfs['labs']['LabDateTime'] > from_date)
-                    & (self.dfs['labs']['LabDateTime'] < to_date)]
-                .groupby(['LabName', 'LabUnits'])[['LabValue']]
-                .describe())
+        details.columns = _pd.MultiIndex.from_product(
+            [['LabValue'], details.columns])
 
         return details
 
-    def lab_plot(self):
+    def lab_trends(self):
+        """Fits each lab's value against patient age and calendar time.
+
+        All labs are fitted together by LabTrendState, whose from_chunks
+        builds the same fits from labs that do not fit in memory.
+
+        Returns:
+            pandas.DataFrame:
+                One row per lab and term ('Intercept', 'Age' in years and
+                'Year' since 2000), with the coefficient, standard error,
+                t value, p value and number of observations.
+        """
+        return LabTrendState(self.dfs['patients']).update(
+            self.dfs['labs']).summary()
+
+    def lab_plot(self, bins=10, data_only=False, lab_types=None):
         """Creates a dictioonary cointaing histogram figures of labvalues for 
         each lab type, with general lab type keys.
 
+        The histograms of every lab are binned together in one pass over the
+        labs, and drawn as pre-binned bars.
+
+        Args:
+            bins (int, optional):
+                Number of equal width bins between the minimum and maximum
+                value of each lab. Defaults to 10.
+            data_only (bool, optional):
+                If True, return the histogram data instead of drawing it, and
+                do not import matplotlib. Defaults to False.
+            lab_types (list, optional):
+                Only include these lab types. Defaults to None (all types).
+
         Returns:
             dict{lab type:(fig, ax)}:
                  where 'fig' is a matplotlib.figure.Figure and 'ax' is a 
                  matplotlib.axes.Axes.
+            or, if 'data_only', dict{lab type:dict{lab name:(counts, edges)}}:
+                 where 'counts' and 'edges' are numpy.ndarray, as returned by
+                 numpy.histogram.
         """
-        plots = {}
+        names, counts, edges = self._lab_histograms(bins)
+
+        only_types, lab_types = lab_types, {}
+        for k, name in enumerate(names):
+            lab_types.setdefault(name.split(':')[0], []).append(k)
+        if only_types is not None:
+            lab_types = {lab_type: labs for lab_type, labs in lab_types.items()
+                         if lab_type in only_types}
 
-        for lab_type in {x.split(':')[0] for x in self.dfs['labs']['LabName']}:
+        if data_only:
+            return {lab_type: {names[k]: (counts[k], edges[k]) for k in labs}
+                    for lab_type, labs in lab_types.items()}
 
-            lab_fig_data = self.dfs['labs'][self.dfs['labs']
-                                            ['LabName'].str.contains(lab_type)]
+        import matplotlib.pyplot as _plt
 
-            labs = set(list(lab_fig_data['LabName']))
+        plots = {}
+
+        for lab_type, labs in lab_types.items():
 
             n = len(labs)
             j = 4
             i = round(n / j + .49)
 
             fig, ax = _plt.subplots(i, j, figsize=(28, i * j))
+            axes = _np.ravel(ax)
 
-            if i != 1:
+            for k, axis in zip(labs, axes):
+                axis.bar(edges[k][:-1], counts[k], width=_np.diff(edges[k]),
+                         align='edge', label='LabValue')
+                axis.grid(True)
+                axis.legend()
+                axis.set_xlabel('Test')
+                axis.set_ylabel('Test')
+                axis.set_title(names[k])
 
-                row, col = 0, 0
-                for lab in labs:
-                    if col == j:
-                        col = 0
-                        row += 1
-                    (lab_fig_data[lab_fig_data['LabName'] ==
-                        lab][['LabValue']].plot(kind='hist', grid=True, 
-                        ax=ax[row, col], xlabel='Test', ylabel='Test')
-                        .set_title(lab))
-                    col += 1
+            for axis in axes[n:]:
+                fig.delaxes(axis)
 
-                if n % j != 0:
-                    for k in range(5 - (n % j)):
-                        fig.delaxes(ax[i - 1, j - 1 - k])
+            plots[lab_type] = fig, ax
 
-            else:
+        return plots
 
-                for i, lab in enumerate(labs):
-                    (lab_fig_data[lab_fig_data['LabName'] ==
-                        lab][['LabValue']].plot(kind='hist', grid=True, 
-                            ax=ax[i], xlabel='Test', ylabel='Test')
-                            .set_title(lab))
+    def render_all(self, out_dir, formats=('png',), workers=None):
+        """Renders every summary figure to files, in parallel and headless.
 
-                if n % j != 0:
-                    for k in range(5 - (n % j)):
-                        fig.delaxes(ax[j - 1 - k])
+        Figures are drawn with the Agg backend in a pool of worker processes,
+        and each is closed as soon as it is saved. A fingerprint of the table
+        each figure is drawn from is kept in the output directory, and figures
+        whose table is unchanged since the last run, with all files present,
+        are not rendered again.
 
-            plots[lab_type] = fig, ax
+        Args:
+            out_dir (str):
+                Directory to write the figures to, created if missing.
+            formats (tuple, optional):
+                File formats to write each figure in, such as 'png', 'svg' or
+                'pdf'. Defaults to ('png',).
+            workers (int, optional):
+                Number of worker processes. Defaults to None (one per CPU).
 
-        return plots
+        Returns:
+            dict{figure name:list}:
+                The paths of each figure's files, rendered or unchanged.
+        """
+        _os.makedirs(out_dir, exist_ok=True)
+        manifest_path = _os.path.join(out_dir, self.RENDER_MANIFEST)
+        try:
+            with open(manifest_path) as manifest_file:
+                manifest = _json.load(manifest_file)
+        except (OSError, ValueError):
+            manifest = {}
+
+        tables = {name: table for name, (_, table) in self.FIGURES.items()}
+        for lab_type in sorted({str(name).split(':')[0] for name in
+                                self.dfs['labs']['LabName'].dropna().unique()}):
+            tables[f'labs_{lab_type}'] = 'labs'
+        fingerprints = {table: self._fingerprint(table)
+                        for table in set(tables.values())}
+
+        outputs, pending = {}, []
+        for name, table in tables.items():
+            outputs[name] = [_os.path.join(out_dir, f'{name}.{fmt}')
+                             for fmt in formats]
+            if manifest.get(name) != fingerprints[table] or \
+                    not all(_os.path.exists(path) for path in outputs[name]):
+                pending.append(name)
+
+        if pending:
+            if any(name.startswith('labs_') for name in pending):
+                # Binned here, once, the histograms go to every worker
+                self._lab_histograms(10)
+            workers = min(workers or _os.cpu_count() or 1, len(pending))
+            with _ProcessPool(max_workers=workers,
+                              initializer=_init_render_worker,
+                              initargs=(self,)) as pool:
+                for name in pool.map(_render_in_worker, pending,
+                                     _repeat(out_dir), _repeat(formats)):
+                    manifest[name] = fingerprints[tables[name]]
+
+            with open(manifest_path + '.tmp', 'w') as manifest_file:
+                _json.dump(manifest, manifest_file, indent=1)
+            _os.replace(manifest_path + '.tmp', manifest_path)
+
+        return outputs
+
+    def _render_figure(self, name, out_dir, formats):
+        """Draws one render_all figure, saves it in each format and closes it.
+
+        Args:
+            name (str):
+                A key of 'FIGURES', or 'labs_<type>' for a lab type.
+            out_dir (str):
+                Directory to write the figure to.
+            formats (tuple):
+                File formats to write.
+
+        Returns:
+            str:
+                The figure name.
+        """
+        import matplotlib.pyplot as _plt
+
+        if name.startswith('labs_'):
+            lab_type = name[len('labs_'):]
+            fig, _ = self.lab_plot(lab_types=[lab_type])[lab_type]
+        else:
+            fig, _ = getattr(self, self.FIGURES[name][0])()
+        try:
+            for fmt in formats:
+                fig.savefig(_os.path.join(out_dir, f'{name}.{fmt}'),
+                            format=fmt, bbox_inches='tight')
+        finally:
+            _plt.close(fig)
+        return name
+
+    def _fingerprint(self, key):
+        """Hashes the contents of a table.
+
+        Args:
+            key (str):
+                The table to hash.
+
+        Returns:
+            str:
+                Hex digest of the table's columns and values.
+        """
+        df = self.dfs[key]
+        digest = _hashlib.sha1(repr(list(df.columns)).encode())
+        digest.update(_pd.util.hash_pandas_object(df, index=False).to_numpy())
+        return digest.hexdigest()
+
+    def _lab_histograms(self, bins):
+        """Bins the values of every lab in a single pass over the labs, once
+        for each number of bins.
+
+        As numpy.histogram, each lab's bins span its minimum to maximum value
+        (or half a unit either side of a constant value) and the last bin is
+        closed on the right.
+
+        Args:
+            bins (int):
+                Number of equal width bins per lab.
+
+        Returns:
+            tuple(list, numpy.ndarray, numpy.ndarray):
+                The lab names, in grouping order, their counts (labs x bins) and
+                their bin edges (labs x bins + 1).
+        """
+        if bins in self._lab_hists:
+            return self._lab_hists[bins]
+
+        labs = self.dfs['labs']
+        grouper = labs.groupby('LabName', observed=True)
+        names = [str(name) for name in grouper.size().index]
+        codes = grouper.ngroup().fillna(-1).to_numpy(dtype=_np.int64)
+        values = labs['LabValue'].to_numpy(dtype=_np.float64)
+
+        valid = (codes >= 0) & ~_np.isnan(values)
+        codes, values = codes[valid], values[valid]
+
+        n_labs = len(names)
+        low = _np.full(n_labs, _np.inf)
+        _np.minimum.at(low, codes, values)
+        high = _np.full(n_labs, -_np.inf)
+        _np.maximum.at(high, codes, values)
+        empty = low > high
+        low[empty], high[empty] = 0, 1
+        constant = low == high
+        low[constant] -= .5
+        high[constant] += .5
+
+        scale = bins / (high - low)
+        position = ((values - low[codes]) * scale[codes]).astype(_np.int64)
+        position = _np.clip(position, 0, bins - 1)
+
+        counts = _np.bincount(codes * bins + position,
+                              minlength=n_labs * bins).reshape(n_labs, bins)
+        edges = low[:, None] + (high - low)[:, None] * \
+            _np.linspace(0, 1, bins + 1)
+
+        self._lab_hists[bins] = names, counts, edges
+        return self._lab_hists[bins]
 
     def personal_plot(self):
         """Creates bar chart figures for each categorical variable in 'patients' data.
@@ -186,6 +635,8 @@ class SummaryInformation():
             fig : matplotlib.figure.Figure
             ax : matplotlib.axes.Axes
         """
+        import matplotlib.pyplot as _plt
+
         categorical_features = [
             'PatientGender',
             'PatientRace',
@@ -198,3 +649,754 @@ class SummaryInformation():
                 kind="bar", ax=ax[i]).set_title(categorical_feature)
 
         return fig, ax
+
+    def _cube_bucket(self, date):
+        """Converts a date to the bucket it falls in.
+
+        Args:
+            date (str or datetime):
+                The date to convert (yyyy-mm-dd if a string).
+
+        Returns:
+            numpy.datetime64
+        """
+        return _np.datetime64(date).astype(f'datetime64[{self.CUBE_FREQ}]')
+
+    def _sorted_window(self, times, from_date=None, to_date=None):
+        """Binary searches the range of sorted times within a date window.
+
+        The window starts at the bucket containing 'from_date' and ends before
+        the bucket containing 'to_date', as for the aggregate cubes.
+
+        Args:
+            times (numpy.ndarray):
+                Sorted datetime64 values, such as the buckets of a cube.
+            from_date (str, optional):
+                The first date of the window (yyyy-mm-dd). Defaults to None
+                (the first value).
+            to_date (str, optional):
+                The date the window ends before (yyyy-mm-dd). Defaults to None
+                (after the last value).
+
+        Returns:
+            tuple(int, int):
+                Start and end positions of the window in 'times'.
+        """
+        start, end = 0, len(times)
+        if from_date is not None:
+            start = _np.searchsorted(
+                times, self._cube_bucket(from_date).astype(times.dtype))
+        if to_date is not None:
+            end = _np.searchsorted(
+                times, self._cube_bucket(to_date).astype(times.dtype))
+        return start, max(start, end)
+
+    def _get_column(self, key, column):
+        """Gets a column of a table, parsing or deriving it on first use.
+
+        Date columns (see 'DATE_COLUMNS') are parsed to datetimes. The derived
+        column 'LengthOfStay' of admissions is the admission length in days.
+        Other columns are returned as they are.
+
+        Args:
+            key (str):
+                The table the column belongs to.
+            column (str):
+                The column name.
+
+        Returns:
+            pandas.Series
+        """
+        if (key, column) in self._columns:
+            return self._columns[(key, column)]
+
+        if column in self.DATE_COLUMNS.get(key, []):
+            series = self.dfs[key][column]
+            if not _pd.api.types.is_datetime64_any_dtype(series):
+                series = _pd.to_datetime(series)
+        elif (key, column) == ('admissions', 'LengthOfStay'):
+            series = (self._get_column(key, 'AdmissionEndDate')
+                      - self._get_column(key, 'AdmissionStartDate')) / \
+                _np.timedelta64(1, 'D')
+            series.name = column
+        else:
+            return self.dfs[key][column]
+
+        self._columns[(key, column)] = series
+        return series
+
+    def _get_time_index(self, key):
+        """Builds, once, the sorted time index of a table.
+
+        Args:
+            key (str):
+                The table to index, one of 'TIME_COLUMNS'.
+
+        Returns:
+            tuple(numpy.ndarray, numpy.ndarray):
+                The sorted timestamps, without missing values, and the row
+                positions they came from.
+        """
+        if key not in self._time_indexes:
+            times = self._get_column(key, self.TIME_COLUMNS[key]).to_numpy()
+            order = _np.argsort(times, kind='stable')
+            order = order[:len(order) - _np.isnat(times).sum()]
+            self._time_indexes[key] = (times[order], order)
+        return self._time_indexes[key]
+
+    def _time_window(self, key, from_date=None, to_date=None):
+        """Selects the rows of a table within a date window.
+
+        Args:
+            key (str):
+                The table to select from, one of 'TIME_COLUMNS'.
+            from_date (str, optional):
+                The first date of the window (yyyy-mm-dd). Defaults to None
+                (the minimum date).
+            to_date (str, optional):
+                The date the window ends before (yyyy-mm-dd). Defaults to None
+                (the maximum date).
+
+        Returns:
+            pandas.DataFrame:
+                The rows in the window, in time order.
+        """
+        times, order = self._get_time_index(key)
+        start, end = self._sorted_window(times, from_date, to_date)
+        return self.dfs[key].take(order[start:end])
+
+    def _get_admissions_cube(self):
+        """Builds, once, the per-bucket admission counts.
+
+        Returns:
+            dict:
+                'buckets' (sorted datetime64 buckets) and 'count' (number of
+                admissions starting in each bucket).
+        """
+        if self._admissions_cube is None:
+            buckets = (self._get_column('admissions', 'AdmissionStartDate')
+                       .to_numpy()
+                       .astype(f'datetime64[{self.CUBE_FREQ}]'))
+            buckets, count = _np.unique(buckets[~_np.isnat(buckets)],
+                                        return_counts=True)
+            self._admissions_cube = {'buckets': buckets, 'count': count}
+        return self._admissions_cube
+
+    def _get_census_events(self):
+        """Builds, once, the sorted admission and discharge events.
+
+        Returns:
+            tuple:
+                The sorted days on which occupancy changes, the occupancy from
+                each of those days on, and the first and last days with an
+                admission or discharge.
+        """
+        if self._census_events is None:
+            dtype = f'datetime64[{self.CUBE_FREQ}]'
+            starts = self._get_column(
+                'admissions', 'AdmissionStartDate').to_numpy().astype(dtype)
+            ends = self._get_column(
+                'admissions', 'AdmissionEndDate').to_numpy().astype(dtype)
+            ends = ends[~_np.isnat(starts) & ~_np.isnat(ends)]
+            starts = starts[~_np.isnat(starts)]
+
+            days, inverse = _np.unique(_np.concatenate([starts, ends + 1]),
+                                       return_inverse=True)
+            change = _np.bincount(
+                inverse,
+                _np.concatenate([_np.ones(len(starts)), -_np.ones(len(ends))]),
+                len(days))
+            bounds = _np.concatenate([starts, ends])
+            self._census_events = (
+                days, _np.cumsum(change).astype(_np.int64),
+                bounds.min() if len(bounds) else _np.datetime64('NaT', 'D'),
+                bounds.max() if len(bounds) else _np.datetime64('NaT', 'D'))
+        return self._census_events
+
+    def _get_census_index(self):
+        """Builds, once, the interval index of admissions used by in_hospital.
+
+        Admissions are split at the 'CENSUS_LONG_STAY_QUANTILE' length of
+        stay. The rest are sorted by start, so the only ones that can cover a
+        day are those that started at most that length of stay before it, a
+        binary searched slice. The few longer or unfinished stays are checked
+        directly.
+
+        Returns:
+            dict:
+                'window' (the length of stay split), 'starts', 'ends' and
+                'rows' (sorted starts, ends and row positions of the shorter
+                stays) and 'long_starts', 'long_ends' and 'long_rows'.
+        """
+        if self._census_index is None:
+            starts = self._get_column(
+                'admissions', 'AdmissionStartDate').to_numpy()
+            ends = self._get_column(
+                'admissions', 'AdmissionEndDate').to_numpy()
+            rows = _np.flatnonzero(~_np.isnat(starts))
+            starts, ends = starts[rows], ends[rows]
+            ends = _np.where(_np.isnat(ends), _np.datetime64('2262-01-01'),
+                             ends).astype(starts.dtype)
+
+            stays = ends - starts
+            window = _np.quantile(stays.astype(_np.int64),
+                                  self.CENSUS_LONG_STAY_QUANTILE) \
+                if len(stays) else 0
+            window = _np.timedelta64(int(window), 'ns')
+            long = stays > window
+            order = _np.argsort(starts[~long], kind='stable')
+
+            self._census_index = {
+                'window': window,
+                'starts': starts[~long][order],
+                'ends': ends[~long][order],
+                'rows': rows[~long][order],
+                'long_starts': starts[long],
+                'long_ends': ends[long],
+                'long_rows': rows[long],
+            }
+        return self._census_index
+
+    def _readmission_rates(self, readmissions, groups, windows):
+        """Counts index admissions and readmissions for groups of admissions.
+
+        Args:
+            readmissions (pandas.DataFrame):
+                Admissions with 'Discharged' and 'DaysToReadmission' columns.
+            groups (array or list):
+                Grouping keys for the admissions, as for DataFrame.groupby.
+            windows (tuple):
+                Readmission windows in days.
+
+        Returns:
+            pandas.DataFrame
+        """
+        days = readmissions['DaysToReadmission']
+        counts = _pd.DataFrame({'Admissions': readmissions['Discharged']})
+        for window in windows:
+            counts[f'Readmissions{window}'] = days <= window
+        rates = counts.groupby(groups, observed=True).sum()
+        for window in windows:
+            rates[f'ReadmissionRate{window}'] = \
+                rates[f'Readmissions{window}'] / rates['Admissions']
+        return rates
+
+    def _get_readmissions(self):
+        """Builds, once, the days from each discharge to the next admission.
+
+        Admissions are sorted by patient and start date, and each discharge
+        is compared with the next row's start when it belongs to the same
+        patient.
+
+        Returns:
+            pandas.DataFrame:
+                'PatientID', 'AdmissionID', 'Discharged' (whether the admission
+                has an end date) and 'DaysToReadmission' (NaN when there is no
+                later admission), sorted by patient and start date.
+        """
+        if self._readmissions is None:
+            admissions = self.dfs['admissions']
+            patients = _pd.factorize(admissions['PatientID'])[0]
+            starts = self._get_column(
+                'admissions', 'AdmissionStartDate').to_numpy()
+            ends = self._get_column('admissions', 'AdmissionEndDate').to_numpy()
+            order = _np.lexsort((starts, patients))
+            patients, starts, ends = \
+                patients[order], starts[order], ends[order]
+
+            days = _np.full(len(order), _np.nan)
+            gaps = (starts[1:] - ends[:-1]) / _np.timedelta64(1, 'D')
+            days[:-1] = _np.where(patients[1:] == patients[:-1], gaps, _np.nan)
+
+            self._readmissions = _pd.DataFrame({
+                'PatientID': admissions['PatientID'].to_numpy()[order],
+                'AdmissionID': admissions['AdmissionID'].to_numpy()[order],
+                'Discharged': ~_np.isnat(ends),
+                'DaysToReadmission': days,
+            })
+        return self._readmissions
+
+    def _get_labs_cube(self):
+        """Builds, once, per-bucket lab value statistics for each lab type.
+
+        Values are shifted by the mean of their lab type before summing, so
+        that the variance computed from the sums keeps its precision.
+
+        Returns:
+            dict:
+                'buckets' (sorted datetime64 buckets), 'groups' (MultiIndex of
+                LabName and LabUnits), 'shift' (per group), 'cumcount',
+                'cumsum' and 'cumsumsq' (groups x buckets + 1 cumulative sums
+                starting at 0), and 'min' and 'max' (groups x buckets).
+        """
+        if self._labs_cube is None:
+            labs = self.dfs['labs']
+            grouper = labs.groupby(['LabName', 'LabUnits'], observed=True)
+            groups = grouper.size().index
+            # Labs missing a name or unit have no group, so a NaN code
+            codes = grouper.ngroup().fillna(-1).to_numpy(dtype=_np.int64)
+            values = labs['LabValue'].to_numpy(dtype=_np.float64)
+            buckets = (self._get_column('labs', 'LabDateTime')
+                       .to_numpy()
+                       .astype(f'datetime64[{self.CUBE_FREQ}]'))
+
+            valid = (codes >= 0) & ~_np.isnan(values) & ~_np.isnat(buckets)
+            codes, values = codes[valid], values[valid]
+            buckets, bucket_codes = _np.unique(buckets[valid],
+                                               return_inverse=True)
+
+            n_groups, n_buckets = len(groups), len(buckets)
+            size = n_groups * n_buckets
+            group_count = _np.bincount(codes, minlength=n_groups)
+            shift = _np.bincount(codes, values, n_groups) / \
+                _np.maximum(group_count, 1)
+            shifted = values - shift[codes]
+            cells = codes * n_buckets + bucket_codes
+
+            extremes = _pd.Series(values).groupby(cells).agg(['min', 'max'])
+            cell_min = _np.full(size, _np.inf)
+            cell_min[extremes.index] = extremes['min']
+            cell_max = _np.full(size, -_np.inf)
+            cell_max[extremes.index] = extremes['max']
+
+            def cumulative(weights=None):
+                cell_sums = _np.bincount(cells, weights, size)
+                return _np.concatenate([
+                    _np.zeros((n_groups, 1)),
+                    _np.cumsum(cell_sums.reshape(n_groups, n_buckets), axis=1)
+                ], axis=1)
+
+            self._labs_cube = {
+                'buckets': buckets,
+                'groups': groups,
+                'shift': shift,
+                'cumcount': cumulative(),
+                'cumsum': cumulative(shifted),
+                'cumsumsq': cumulative(shifted * shifted),
+                'min': cell_min.reshape(n_groups, n_buckets),
+                'max': cell_max.reshape(n_groups, n_buckets),
+            }
+        return self._labs_cube
+
+
+class LabSummaryState():
+    """Mergeable per-lab statistics, for summarising labs out of core.
+
+    For each lab name and unit it keeps the count, mean and sum of squared
+    deviations (merged with Chan's parallel formula), the minimum and maximum,
+    and a t-digest style sketch of at most about 'compression' centroids for
+    the quantiles. Memory is bounded by the number of labs, whatever the
+    number of rows, and states built from separate chunks, shards or
+    processes can be merged.
+    """
+
+    # Default size of each lab's quantile sketch
+    COMPRESSION = 200
+
+    def __init__(self, compression=COMPRESSION):
+
+        self.compression = compression
+        self._labs = {}
+
+    @classmethod
+    def from_chunks(cls, chunks, compression=COMPRESSION):
+        """Builds a state from an iterable of labs DataFrames.
+
+        Args:
+            chunks (iterable):
+                DataFrames with 'LabName', 'LabUnits' and 'LabValue' columns,
+                or (content type, DataFrame) tuples as yielded by
+                data.Loader.iter_chunks, of which only 'labs' are used.
+            compression (int, optional):
+                Size of each lab's quantile sketch. Defaults to 200.
+
+        Returns:
+            LabSummaryState
+        """
+        state = cls(compression)
+        for chunk in chunks:
+            if isinstance(chunk, tuple):
+                content_type, chunk = chunk
+                if content_type != 'labs':
+                    continue
+            state.update(chunk)
+        return state
+
+    @classmethod
+    def from_shards(cls, shard_paths, workers=1, compression=COMPRESSION,
+                    chunksize=100000):
+        """Builds a state from zip or text file shards, one process per shard.
+
+        Shards are streamed in chunks, so no shard is held in memory whole.
+        Unlike data.Loader.load_shards, rows repeated across shards are not
+        deduplicated.
+
+        Args:
+            shard_paths (list):
+                Paths of the zip or text files to summarise.
+            workers (int, optional):
+                Number of worker processes. Defaults to 1.
+            compression (int, optional):
+                Size of each lab's quantile sketch. Defaults to 200.
+            chunksize (int, optional):
+                Number of rows read at a time. Defaults to 100000.
+
+        Returns:
+            LabSummaryState
+        """
+        state = cls(compression)
+        if workers > 1 and len(shard_paths) > 1:
+            with _ProcessPool(max_workers=workers) as pool:
+                for shard_state in pool.map(
+                        _summarise_lab_shard, shard_paths,
+                        _repeat(compression), _repeat(chunksize)):
+                    state.merge(shard_state)
+        else:
+            for shard_path in shard_paths:
+                state.merge(
+                    _summarise_lab_shard(shard_path, compression, chunksize))
+        return state
+
+    def update(self, labs):
+        """Adds a chunk of labs to the state.
+
+        Args:
+            labs (pandas.DataFrame):
+                Labs with 'LabName', 'LabUnits' and 'LabValue' columns.
+
+        Returns:
+            LabSummaryState:
+                The updated state itself.
+        """
+        labs = labs[labs['LabValue'].notna()]
+        grouper = labs.groupby(['LabName', 'LabUnits'], observed=True)
+        keys = grouper.size().index
+        codes = grouper.ngroup().fillna(-1).to_numpy(dtype=_np.int64)
+        values = labs['LabValue'].to_numpy(dtype=_np.float64)
+        valid = codes >= 0
+        codes, values = codes[valid], values[valid]
+        order = _np.argsort(codes, kind='stable')
+        codes, values = codes[order], values[order]
+
+        count = _np.bincount(codes, minlength=len(keys))
+        starts = _np.concatenate([[0], _np.cumsum(count)[:-1]])
+        mean = _np.bincount(codes, values, len(keys)) / count
+        m2 = _np.bincount(codes, (values - mean[codes]) ** 2, len(keys))
+        low = _np.minimum.reduceat(values, starts) if len(values) else []
+        high = _np.maximum.reduceat(values, starts) if len(values) else []
+
+        for k, key in enumerate(keys):
+            chunk_values = values[starts[k]:starts[k] + count[k]]
+            self._merge_lab(
+                (str(key[0]), str(key[1])),
+                [count[k], mean[k], m2[k], low[k], high[k],
+                 chunk_values, _np.ones(count[k])])
+        return self
+
+    def merge(self, other):
+        """Merges another state into this one.
+
+        Args:
+            other (LabSummaryState):
+                The state to merge, which is not modified.
+
+        Returns:
+            LabSummaryState:
+                The merged state itself.
+        """
+        for key, lab in other._labs.items():
+            self._merge_lab(key, list(lab))
+        return self
+
+    def summary(self, quantiles=True):
+        """Creates the table of lab_summary from the state.
+
+        Args:
+            quantiles (bool, optional):
+                If True, include the 25%, 50% and 75% quantiles estimated from
+                the sketches. Defaults to True.
+
+        Returns:
+            pandas.DataFrame
+        """
+        keys = sorted(self._labs)
+        rows = []
+        for key in keys:
+            count, mean, m2, low, high, means, weights = self._labs[key]
+            row = {
+                'count': float(count),
+                'mean': mean,
+                'std': _np.sqrt(m2 / (count - 1)) if count > 1 else _np.nan,
+                'min': low,
+            }
+            if quantiles:
+                row.update(zip(['25%', '50%', '75%'], self._quantiles(
+                    count, low, high, means, weights, [.25, .5, .75])))
+            row['max'] = high
+            rows.append(row)
+
+        details = _pd.DataFrame(
+            rows,
+            index=_pd.MultiIndex.from_tuples(keys,
+                                             names=['LabName', 'LabUnits']),
+            columns=['count', 'mean', 'std', 'min'] +
+            (['25%', '50%', '75%'] if quantiles else []) + ['max'])
+        details.columns = _pd.MultiIndex.from_product(
+            [['LabValue'], details.columns])
+
+        return details
+
+    def _merge_lab(self, key, lab):
+        """Merges the statistics of one lab into the state.
+
+        Args:
+            key (tuple):
+                The lab name and units.
+            lab (list):
+                Count, mean, sum of squared deviations, minimum, maximum, and
+                the sketch centroid means and weights.
+        """
+        if key not in self._labs:
+            self._labs[key] = lab
+            lab[5], lab[6] = self._compress(lab[5], lab[6])
+            return
+
+        count, mean, m2, low, high, means, weights = self._labs[key]
+        total = count + lab[0]
+        delta = lab[1] - mean
+        self._labs[key] = [
+            total,
+            mean + delta * lab[0] / total,
+            m2 + lab[2] + delta * delta * count * lab[0] / total,
+            min(low, lab[3]),
+            max(high, lab[4]),
+            *self._compress(_np.concatenate([means, lab[5]]),
+                            _np.concatenate([weights, lab[6]])),
+        ]
+
+    def _compress(self, means, weights):
+        """Merges neighbouring sketch centroids down to about 'compression'.
+
+        Centroids are bucketed on the arcsine scale of their quantile, so that
+        buckets are smaller, and quantiles more accurate, towards the tails.
+
+        Args:
+            means (numpy.ndarray):
+                Centroid means.
+            weights (numpy.ndarray):
+                Centroid weights.
+
+        Returns:
+            tuple(numpy.ndarray, numpy.ndarray):
+                The merged centroid means and weights, sorted by mean.
+        """
+        order = _np.argsort(means, kind='stable')
+        means, weights = means[order], weights[order]
+        if len(means) <= self.compression:
+            return means, weights
+
+        cumulative = _np.cumsum(weights)
+        quantile = (cumulative - weights / 2) / cumulative[-1]
+        bucket = _np.floor(self.compression *
+                           (_np.arcsin(2 * quantile - 1) / _np.pi + .5))
+        starts = _np.concatenate([[0], _np.flatnonzero(_np.diff(bucket)) + 1])
+        merged = _np.add.reduceat(weights, starts)
+        return _np.add.reduceat(means * weights, starts) / merged, merged
+
+    def _quantiles(self, count, low, high, means, weights, quantiles):
+        """Interpolates quantiles from a lab's sketch.
+
+        Matches the linear interpolation of pandas while the sketch still
+        holds every value.
+
+        Args:
+            count (int):
+                Number of values.
+            low, high (float):
+                Minimum and maximum value.
+            means, weights (numpy.ndarray):
+                Centroid means and weights.
+            quantiles (list):
+                Quantiles to estimate, between 0 and 1.
+
+        Returns:
+            numpy.ndarray
+        """
+        positions = _np.concatenate(
+            [[0], _np.cumsum(weights) - weights / 2, [count]])
+        values = _np.concatenate([[low], means, [high]])
+        return _np.interp(_np.asarray(quantiles) * (count - 1) + .5,
+                          positions, values)
+
+
+class LabTrendState():
+    """Mergeable least-squares fits of each lab's value on age and time.
+
+    For each lab name and unit, LabValue is regressed on the patient's age
+    at the time of the lab (in years) and on calendar time (in years since
+    2000). Only the sufficient statistics X'X, X'y, y'y and the count are
+    kept, so chunks can be added one at a time or merged across processes,
+    and every lab's fit is then solved at once as a stack of 3 x 3 systems.
+    """
+
+    # Names of the regression terms, in design matrix column order
+    TERMS = ['Intercept', 'Age', 'Year']
+
+    # Calendar time origin of the 'Year' term
+    EPOCH = _np.datetime64('2000-01-01', 'ns')
+
+    def __init__(self, patients):
+        """Initializes an empty state.
+
+        Args:
+            patients (pandas.DataFrame):
+                The patients table, for each patient's date of birth.
+        """
+        self._births = _pd.Series(
+            _pd.to_datetime(patients['PatientDateOfBirth']).to_numpy(),
+            index=patients['PatientID'])
+        self._labs = {}
+
+    @classmethod
+    def from_chunks(cls, chunks, patients):
+        """Builds a state from an iterable of labs DataFrames.
+
+        Args:
+            chunks (iterable):
+                DataFrames with 'PatientID', 'LabName', 'LabUnits',
+                'LabValue' and 'LabDateTime' columns, or (content type,
+                DataFrame) tuples as yielded by data.Loader.iter_chunks, of
+                which only 'labs' are used.
+            patients (pandas.DataFrame):
+                The patients table, for each patient's date of birth.
+
+        Returns:
+            LabTrendState
+        """
+        state = cls(patients)
+        for chunk in chunks:
+            if isinstance(chunk, tuple):
+                content_type, chunk = chunk
+                if content_type != 'labs':
+                    continue
+            state.update(chunk)
+        return state
+
+    def update(self, labs):
+        """Adds a chunk of labs to the state.
+
+        Labs with a missing value, date or date of birth are left out.
+
+        Args:
+            labs (pandas.DataFrame):
+                Labs with 'PatientID', 'LabName', 'LabUnits', 'LabValue' and
+                'LabDateTime' columns.
+
+        Returns:
+            LabTrendState:
+                The updated state itself.
+        """
+        year = _np.timedelta64(int(365.25 * 86400e9), 'ns')
+        times = _pd.to_datetime(labs['LabDateTime']).to_numpy()
+        births = self._births.reindex(labs['PatientID']).to_numpy()
+        design = _np.stack([
+            _np.ones(len(labs)),
+            (times - births) / year,
+            (times - self.EPOCH) / year,
+        ], axis=1)
+        values = labs['LabValue'].to_numpy(dtype=_np.float64)
+
+        valid = ~_np.isnan(values) & ~_np.isnan(design).any(axis=1)
+        labs = labs[valid]
+        design, values = design[valid], values[valid]
+
+        grouper = labs.groupby(['LabName', 'LabUnits'], observed=True)
+        keys = grouper.size().index
+        codes = grouper.ngroup().fillna(-1).to_numpy(dtype=_np.int64)
+        valid = codes >= 0
+        codes, design, values = codes[valid], design[valid], values[valid]
+
+        n_terms = len(self.TERMS)
+        sums = _np.empty((len(keys), n_terms, n_terms + 1))
+        for i in range(n_terms):
+            for j in range(i, n_terms + 1):
+                column = values if j == n_terms else design[:, j]
+                sums[:, i, j] = _np.bincount(codes, design[:, i] * column,
+                                             len(keys))
+                if j < n_terms:
+                    sums[:, j, i] = sums[:, i, j]
+        sums = _np.concatenate([
+            sums.reshape(len(keys), -1),
+            _np.bincount(codes, values * values, len(keys))[:, None],
+        ], axis=1)
+
+        for k, key in enumerate(keys):
+            key = (str(key[0]), str(key[1]))
+            if key in self._labs:
+                self._labs[key] += sums[k]
+            else:
+                self._labs[key] = sums[k]
+        return self
+
+    def merge(self, other):
+        """Merges another state into this one.
+
+        Args:
+            other (LabTrendState):
+                The state to merge, which is not modified.
+
+        Returns:
+            LabTrendState:
+                The merged state itself.
+        """
+        for key, sums in other._labs.items():
+            if key in self._labs:
+                self._labs[key] = self._labs[key] + sums
+            else:
+                self._labs[key] = sums.copy()
+        return self
+
+    def summary(self):
+        """Solves every lab's regression.
+
+        Returns:
+            pandas.DataFrame:
+                One row per lab and term, with 'LabName', 'LabUnits', 'Term',
+                'Coefficient', 'StdError', 'TValue', 'PValue' and
+                'Observations'. Standard errors are NaN for labs with too few
+                labs, or too little spread in age or time, to fit.
+        """
+        from scipy import stats as _stats
+
+        n_terms = len(self.TERMS)
+        keys = sorted(self._labs)
+        sums = _np.array([self._labs[key] for key in keys]).reshape(
+            len(keys), n_terms * (n_terms + 1) + 1)
+        xtx_xty = sums[:, :-1].reshape(len(keys), n_terms, n_terms + 1)
+        xtx, xty = xtx_xty[:, :, :n_terms], xtx_xty[:, :, n_terms]
+        yty, count = sums[:, -1], xtx[:, 0, 0]
+
+        inverse = _np.linalg.pinv(xtx)
+        coefficients = _np.einsum('gij,gj->gi', inverse, xty)
+        residual = yty - _np.einsum('gi,gi->g', coefficients, xty)
+        dof = count - n_terms
+        full_rank = _np.linalg.matrix_rank(xtx) == n_terms
+        with _np.errstate(divide='ignore', invalid='ignore'):
+            variance = _np.where(full_rank & (dof > 0),
+                                 _np.clip(residual, 0, None) / dof, _np.nan)
+            errors = _np.sqrt(variance[:, None] *
+                              _np.diagonal(inverse, axis1=1, axis2=2))
+            t_values = coefficients / errors
+        p_values = 2 * _stats.t.sf(_np.abs(t_values),
+                                   _np.maximum(dof, 1)[:, None])
+
+        index = _pd.MultiIndex.from_tuples(
+            [key + (term,) for key in keys for term in self.TERMS],
+            names=['LabName', 'LabUnits', 'Term'])
+        return _pd.DataFrame({
+            'Coefficient': coefficients.ravel(),
+            'StdError': errors.ravel(),
+            'TValue': t_values.ravel(),
+            'PValue': p_values.ravel(),
+            'Observations': _np.repeat(count, n_terms).astype(_np.int64),
+        }, index=index).reset_index()